@@ -0,0 +1,550 @@
+"""Benchmarks of the cleaning helpers and of the whole pipeline.
+
+Run from the Code folder:
+
+    python benchmark.py --rows 20000
+        the vectorized cleaning helpers against the old per-row loops, and the newer
+        implementations against the code they replaced, each checked to give the same results
+    python benchmark.py --suite scaling --sizes 10000 100000 1000000 10000000 --json ../bench/scaling.json
+        every pipeline stage on synthetic postings, with throughput and peak RSS per stage;
+        --baseline old.json compares against an earlier run
+"""
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import platform
+import re
+import subprocess
+import time
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from salary_prediction import __version__, eda, itemsets, models, pipeline, stats, synthetic
+from salary_prediction.features import SKILL_TYPES
+from salary_prediction.titles import TITLE_REWRITES, normalize_job_titles
+from salary_prediction.instrument import RssSampler
+from salary_prediction.clean import REVENUE_LABELS, normalize_descriptions, parse_salary_estimate, parse_employee_size, parse_revenue
+
+SALARY_FORMATS = ['${0}K-${1}K (Glassdoor est.)', '${0}K-${1}K(Employer est.)']
+SIZES = ['1 to 50 employees', '51 to 200 employees', '201 to 500 employees', '501 to 1000 employees',
+         '1001 to 5000 employees', '5001 to 10000 employees', '10000+ employees', 'Unknown', np.nan]
+
+
+def sample_salary_estimates(rows, seed=0):
+    #Glassdoor style salary ranges, per hour rows are filtered before the loop in code.py
+    rng = np.random.default_rng(seed)
+    low = rng.integers(20, 150, rows)
+    high = low + rng.integers(5, 90, rows)
+    fmt = rng.integers(0, len(SALARY_FORMATS), rows)
+    return pd.Series([SALARY_FORMATS[f].format(a, b) for f, a, b in zip(fmt, low, high)])
+
+
+def legacy_salary_loop(salary):
+    #The Min_Salary/Max_Salary loop from code.py, kept as the baseline
+    jobs = pd.DataFrame({'Salary_Estimate': salary})
+    jobs['Salary_Estimate'] = jobs['Salary_Estimate'].map(lambda x: x.rstrip('(Employer est.)'))
+    jobs['Min_Salary'] = 0
+    jobs['Max_Salary'] = 0
+
+    for x in range(len(jobs)):
+        if(type(jobs.iloc[x, 0]) == float):
+            jobs.iloc[x, 1] = np.nan
+            jobs.iloc[x, 2] = np.nan
+        else:
+            cleanSal = jobs.iloc[x, 0].replace('(Glassd', '').strip().split('-')
+
+        if('K' in cleanSal[0]):
+            jobs.iloc[x, 1] = float(cleanSal[0].replace('$', '').replace('K', ''))
+
+        if('K' in cleanSal[1]):
+            jobs.iloc[x, 2] = float(cleanSal[1].replace('$', '').replace('K', ''))
+
+    return jobs[['Min_Salary', 'Max_Salary']]
+
+
+def sample_sizes(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.Series(np.array(SIZES, dtype=object)[rng.integers(0, len(SIZES), rows)])
+
+
+def legacy_size_loop(size):
+    #The MaxEmpSize loop from code.py, kept as the baseline
+    jobs = pd.DataFrame({'Size': size})
+    jobs['MaxEmpSize'] = 0
+
+    for x in range(len(jobs)):
+        emp = jobs.iloc[x, 0]
+
+        try:
+            if(type(emp) == float or emp == 'Unknown'):
+                jobs.iloc[x, 1] = np.nan
+            elif('+' in emp):
+                jobs.iloc[x, 1] = float(emp.replace('+', '').replace('employees', '').strip())
+            elif('employees' in emp):
+                jobs.iloc[x, 1] = float(emp.replace('employees', '').strip().split('to')[1])
+        except(Exception)as e:
+            print(e, emp)
+
+    return jobs['MaxEmpSize']
+
+
+def sample_revenues(rows, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = np.array(REVENUE_LABELS + [np.nan], dtype=object)
+    return pd.Series(labels[rng.integers(0, len(labels), rows)])
+
+
+def legacy_revenue_loop(revenue):
+    #The MaxRevenue loop from code.py, kept as the baseline
+    jobs = pd.DataFrame({'Revenue': revenue})
+    jobs['MaxRevenue'] = 0
+
+    for x in range(len(jobs)):
+        rev = jobs.iloc[x, 0]
+
+        if(rev == 'Unknown / Non-Applicable' or type(rev) == float):
+            jobs.iloc[x, 1] = np.nan
+        elif(('million' in rev) and ('billion' not in rev)):
+            maxRev = rev.replace('(USD)', '').replace("million", '').replace('$', '').strip().split('to')
+            if('Less than' in maxRev[0]):
+                jobs.iloc[x, 1] = float(maxRev[0].replace('Less than', '').strip())*100000000
+            else:
+                if(len(maxRev) == 2):
+                    jobs.iloc[x, 1] = float(maxRev[1])*100000000
+                elif(len(maxRev) < 2):
+                    jobs.iloc[x, 1] = float(maxRev[0])*100000000
+        elif(('billion' in rev)):
+            maxRev = rev.replace('(USD)', '').replace("billion", '').replace('$', '').strip().split('to')
+            if('+' in maxRev[0]):
+                jobs.iloc[x, 1] = float(maxRev[0].replace('+', '').strip())*1000000000
+            else:
+                if(len(maxRev) == 2):
+                    jobs.iloc[x, 1] = float(maxRev[1])*1000000000
+                elif(len(maxRev) < 2):
+                    jobs.iloc[x, 1] = float(maxRev[0])*1000000000
+
+    return jobs['MaxRevenue']
+
+
+EQUAL_EMP = ('kelly is an equal opportunity employer committed to employing a diverse workforce, including, '
+             'but not limited to, minorities, females, individuals with disabilities, protected veterans, '
+             'sexual orientation, gender identity. equal employment opportunity is the law.').split(' ')
+
+
+def sample_descriptions(rows, words=300, seed=0):
+    rng = np.random.default_rng(seed)
+    vocab = np.array(['Data', 'scientist', 'Python,', 'SQL', "team's", 'Kelly', 'equal', 'opportunity',
+                      'machine-learning', 'AWS/Spark', 'reporting', '5+', 'years', 'Power', 'BI', 'the', 'law.'])
+    return pd.Series([' '.join(vocab[rng.integers(0, len(vocab), words)]) for _ in range(rows)])
+
+
+def legacy_text_passes(descriptions):
+    #The four Job_Description passes from code.py, kept as the baseline
+    jobs = pd.DataFrame({'Job_Description': descriptions})
+    jobs['Job_Description'] = jobs['Job_Description'].str.lower()
+    regex = re.compile('[^a-zA-Z\']')
+    jobs['Job_Description'] = jobs['Job_Description'].apply(lambda x: regex.sub(' ', x))
+    jobs['Job_Description'] = jobs['Job_Description'].apply(lambda x: [item for item in x.split() if item.lower() not in EQUAL_EMP])
+    jobs['Job_Description'] = jobs['Job_Description'].apply(lambda x: ' '.join(x))
+    return jobs['Job_Description']
+
+
+def best_time(func, *args, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def compare(stage, data, impls, repeat=3):
+    #Times each (name, func) on the same input; the first impl is the legacy loop and runs once
+    results = []
+    for i, (name, func) in enumerate(impls):
+        seconds = best_time(func, data, repeat=1 if i == 0 else repeat)
+        results.append({'stage': stage, 'impl': name, 'rows': len(data),
+                        'seconds': seconds, 'rows_per_sec': len(data) / seconds})
+    return pd.DataFrame(results)
+
+
+def bench_salary(rows, repeat=3):
+    salary = sample_salary_estimates(rows)
+
+    expected = legacy_salary_loop(salary)
+    parsed = parse_salary_estimate(salary)
+    pd.testing.assert_frame_equal(parsed[['Min_Salary', 'Max_Salary']], expected, check_dtype=False)
+
+    return compare('salary', salary, [('legacy loop', legacy_salary_loop),
+                                      ('parse_salary_estimate', parse_salary_estimate)], repeat)
+
+
+def bench_size(rows, repeat=3):
+    size = sample_sizes(rows)
+
+    expected = legacy_size_loop(size)
+    pd.testing.assert_series_equal(parse_employee_size(size), expected, check_dtype=False)
+
+    return compare('size', size, [('legacy loop', legacy_size_loop),
+                                  ('parse_employee_size', parse_employee_size)], repeat)
+
+
+def bench_revenue(rows, repeat=3):
+    revenue = sample_revenues(rows)
+
+    expected = legacy_revenue_loop(revenue)
+    pd.testing.assert_series_equal(parse_revenue(revenue), expected, check_dtype=False)
+
+    return compare('revenue', revenue, [('legacy loop', legacy_revenue_loop),
+                                        ('parse_revenue', parse_revenue)], repeat)
+
+
+def bench_text(rows, repeat=3):
+    descriptions = sample_descriptions(rows)
+
+    expected = legacy_text_passes(descriptions)
+    pd.testing.assert_series_equal(normalize_descriptions(descriptions, EQUAL_EMP), expected, check_names=False)
+
+    return compare('text', descriptions, [('legacy passes', legacy_text_passes),
+                                          ('normalize_descriptions', partial(normalize_descriptions, stopwords=EQUAL_EMP))],
+                   repeat)
+
+
+def sample_skill_lists(rows, seed=0):
+    #refined_skills style lists, each skill category held by its own share of the postings
+    rng = np.random.default_rng(seed)
+    skills = np.array(list(SKILL_TYPES), dtype=object)
+    held = rng.random((rows, len(skills))) < np.linspace(0.05, 0.7, len(skills))
+    return pd.Series([list(skills[row]) for row in held])
+
+
+def legacy_apriori(skills, min_support=0.1):
+    #The TransactionEncoder and mlxtend apriori of code.py with mlxtend's association_rules, kept as the baseline
+    from mlxtend.frequent_patterns import apriori, association_rules
+    from mlxtend.preprocessing import TransactionEncoder
+
+    transactions = [list(x) for x in skills]
+    te = TransactionEncoder()
+    te_ary = te.fit(transactions).transform(transactions)
+    df = pd.DataFrame(te_ary, columns=te.columns_)
+
+    frequent_itemsets = apriori(df, min_support=min_support, use_colnames=True)
+    frequent_itemsets['length'] = frequent_itemsets['itemsets'].apply(lambda x: len(x))
+    rules = association_rules(frequent_itemsets, len(transactions), metric='lift', min_threshold=1.0,
+                              return_metrics=itemsets.RULE_METRICS)
+    return frequent_itemsets, rules
+
+
+def bitset_itemsets(skills, min_support=0.1):
+    frequent_itemsets = itemsets.frequent_itemsets(skills, min_support)
+    return frequent_itemsets, itemsets.association_rules(frequent_itemsets, 'lift', 1.0)
+
+
+def _by_rule(rules):
+    #mlxtend lists the rules in its own order
+    return (rules.sort_values(['antecedents', 'consequents'], key=lambda col: col.map(sorted).map(str))
+            .reset_index(drop=True))
+
+
+def bench_itemsets(rows, repeat=3):
+    skills = sample_skill_lists(rows)
+
+    expected = legacy_apriori(skills)
+    result = bitset_itemsets(skills)
+    pd.testing.assert_frame_equal(result[0], expected[0], check_dtype=False)
+    pd.testing.assert_frame_equal(_by_rule(result[1]), _by_rule(expected[1]), check_dtype=False)
+
+    return compare('itemsets', skills, [('mlxtend apriori', legacy_apriori), ('bitset eclat', bitset_itemsets)], repeat)
+
+
+def sample_anova_jobs(rows, seed=0):
+    #Salaries shifted by sector and state, with missing labels and a company column of many small groups
+    rng = np.random.default_rng(seed)
+    sectors = np.array(['Finance', 'Government', 'Biotech', 'Insurance', 'Retail', np.nan], dtype=object)
+    sector = rng.integers(0, len(sectors), rows)
+    state = rng.integers(0, 50, rows)
+    company = rng.integers(0, max(rows // 10, 2), rows)
+    jobs = pd.DataFrame({'Sector': sectors[sector],
+                         'State': np.char.add('S', state.astype(str)),
+                         'Company_Name': np.char.add('company ', company.astype(str))})
+    jobs['Est_Salary'] = 100 + 5 * sector + 0.2 * state + rng.normal(0, 20, rows)
+    return jobs
+
+
+def legacy_anova(jobs, columns=('Sector', 'State', 'Company_Name'), target='Est_Salary'):
+    #The f_oneway loop of eda.anova, kept as the baseline
+    from scipy.stats import f_oneway
+
+    results = {}
+    for col in columns:
+        groups = jobs.groupby(col)[target].apply(list)
+        results[col] = f_oneway(*groups)
+    return pd.DataFrame.from_dict(results, orient='index', columns=['F', 'P-value'])
+
+
+def streamed_anova(jobs, columns=('Sector', 'State', 'Company_Name'), target='Est_Salary', chunksize=5000):
+    chunks = (jobs.iloc[start:start + chunksize] for start in range(0, len(jobs), chunksize))
+    return stats.streamed_anova(chunks, columns, target)[['F', 'P-value']]
+
+
+def bench_anova(rows, repeat=3):
+    jobs = sample_anova_jobs(rows)
+
+    expected = legacy_anova(jobs)
+    np.testing.assert_allclose(streamed_anova(jobs).loc[expected.index], expected, rtol=1e-6)
+
+    return compare('anova', jobs, [('groupby f_oneway', legacy_anova), ('streamed sums', streamed_anova)], repeat)
+
+
+def sample_title_words(rows, words=200, seed=0):
+    #jobs_lm style 0/1 top word columns from rare to common, the salary raised by the first few words
+    rng = np.random.default_rng(seed)
+    X = (rng.random((rows, words)) < rng.uniform(0.001, 0.3, words)).astype(np.int64)
+    jobs_lm = pd.DataFrame(X, columns=['WORD{}'.format(i) for i in range(words)])
+    jobs_lm['Est_Salary'] = 100 + X[:, :5] @ rng.normal(0, 10, 5) + rng.normal(0, 20, rows)
+    return jobs_lm
+
+
+def legacy_ttests(jobs_lm):
+    #The ttest_ind loop over the top words of eda.title_ttests, kept as the baseline
+    from scipy import stats
+
+    ttests = []
+    for word in jobs_lm.columns.drop('Est_Salary'):
+        ttest = stats.ttest_ind(jobs_lm[jobs_lm[word] == 1]['Est_Salary'],
+                                jobs_lm[jobs_lm[word] == 0]['Est_Salary'])
+        ttests.append([word, ttest[0], ttest[1]])
+    ttests = pd.DataFrame(ttests, columns=['TW', 'Statistic', 'P-value'])
+    return ttests.sort_values('P-value', ascending=True)
+
+
+def batch_ttests(jobs_lm):
+    return eda.title_ttests(jobs_lm, jobs_lm.columns.drop('Est_Salary'))
+
+
+def bench_ttests(rows, repeat=3):
+    jobs_lm = sample_title_words(rows)
+
+    expected = legacy_ttests(jobs_lm).set_index('TW')
+    result = batch_ttests(jobs_lm).set_index('TW').loc[expected.index]
+    np.testing.assert_allclose(result[['Statistic', 'P-value']], expected, rtol=1e-6)
+
+    return compare('ttests', jobs_lm, [('ttest_ind loop', legacy_ttests), ('batch_ttests', batch_ttests)], repeat)
+
+
+TITLES = ['Sr. Data Scientist', 'Data Scientist - Machine Learning/AI', 'Senior Data Analyst, Business Intelligence',
+          'Jr. Data Analyst (Remote)', 'Business Data Analyst', 'Data Engineer, Big Data & Analytics',
+          'Sr Business Intelligence Developer', 'Data Analyst Junior', 'Quality Assurance Analyst III',
+          'Data Warehouse Engineer [Contract]', 'Manager, Data Management and Governance', 'SR/STAFF DATA ENGINEER',
+          'Information Technology Business Analyst', 'User Experience Researcher with Data Reporting',
+          'Data  Reporting Analyst', 'Analytics Engineer\tOperations', 'Systems Analyst - Financial Services',
+          'Finance Data Analyst Sr.', 'Solutions Engineer, Networks', 'Jr Data Base Administrator',
+          'Principal Data Scientist \u2013 Games', 'SENIOR  DATA   ANALYST', 'Data Quality Analyst\nHybrid',
+          'Â Data Analyst', 'Insights & Products Analyst', np.nan]
+
+
+def sample_titles(rows, seed=0):
+    #Real titles, the synthetic generator's titles and runs of the rewrite patterns and their replacements,
+    #each one at least once and then repeated like titles are
+    rng = np.random.default_rng(seed)
+    pieces = sorted({text.replace('\\', '') for table in TITLE_REWRITES for rewrite in table for text in rewrite}
+                    | {' ', 'DATA ', 'ANALYST ', 'sr. ', 'Jr '})
+    fuzz = [''.join(rng.choice(pieces, rng.integers(1, 8))) for _ in range(max(rows // 3, 1))]
+    generated = synthetic.generate_postings(max(rows // 3, 1), seed, words=1)['Job Title'].tolist()
+    titles = np.array(TITLES + generated + fuzz, dtype=object)
+    titles = np.concatenate([titles, titles[rng.integers(0, len(titles), max(rows - len(titles), 0))]])[:rows]
+    return pd.Series(titles, name='job_title')
+
+
+def legacy_title_replaces(titles):
+    #The chained Series.replace calls of eda.normalize_job_titles, kept as the baseline
+    titles = titles.str.upper().replace(
+        [',', 'Â', '/', '\t', '\n', '-', 'AND ', '&', r'\(', r'\)', 'WITH ', 'SYSTEMS', 'OPERATIONS', 'ANALYTICS', 'SERVICES', r'\[', r'\]', 'ENGINEERS', 'NETWORKS', 'GAMES', 'MUSICS', 'INSIGHTS', 'SOLUTIONS', 'JR.', 'MARKETS', 'STANDARDS', 'FINANCE', 'ENGINEERING', 'PRODUCTS', 'DEVELOPERS', 'SR. ', 'SR ', 'JR. ', 'JR '],
+        ['', '', ' ', ' ', ' ', ' ', '', ' ', ' ', ' ', '', 'SYSTEM', 'OPERATION', 'ANALYTIC', 'SERVICE', '', '', 'ENGINEER', 'NETWORK', 'GAME', 'MUSIC', 'INSIGHT', 'SOLUTION', 'JUNIOR', 'MARKET', 'STANDARD', 'FINANCIAL', 'ENGINEER', 'PRODUCT', 'DEVELOPER', 'SENIOR ', 'SENIOR ', 'JUNIOR ', 'JUNIOR '], regex=True)
+
+    titles = titles.str.upper().replace(['  ', '   ', '    '], [' ', ' ', ' '], regex=True)
+
+    #Unifying words
+    titles = titles.str.upper().replace(
+        ['BUSINESS INTELLIGENCE', 'INFORMATION TECHNOLOGY', 'QUALITY ASSURANCE', 'USER EXPERIENCE', 'USER INTERFACE', 'DATA WAREHOUSE', 'DATA ANALYST', 'DATA BASE', 'DATA QUALITY', 'DATA GOVERNANCE', 'BUSINESS ANALYST', 'DATA MANAGEMENT', 'REPORTING ANALYST', 'BUSINESS DATA', 'SYSTEM ANALYST', 'DATA REPORTING', 'QUALITY ANALYST'],
+        ['BI', 'IT', 'QA', 'UX', 'UI', 'DATA_WAREHOUSE', 'DATA_ANALYST', 'DATABASE', 'DATA_QUALITY', 'DATA_GOVERNANCE', 'BUSINESS_ANALYST', 'DATA_MANAGEMENT', 'REPORTING_ANALYST', 'BUSINESS_DATA', 'SYSTEM_ANALYST', 'DATA_REPORTING', 'QUALITY_ANALYST'], regex=True)
+
+    #More unifying
+    return titles.str.upper().replace(
+        ['DATA_ANALYST JUNIOR', 'DATA_ANALYST SENIOR', 'DATA  REPORTING_ANALYST'],
+        ['JUNIOR DATA_ANALYST', 'SENIOR DATA_ANALYST', 'DATA_REPORTING_ANALYST'], regex=True)
+
+
+def bench_titles(rows, repeat=3):
+    titles = sample_titles(rows)
+
+    expected = legacy_title_replaces(titles)
+    pd.testing.assert_series_equal(normalize_job_titles(titles), expected)
+
+    return compare('titles', titles, [('chained replace', legacy_title_replaces),
+                                      ('TitleNormalizer', normalize_job_titles)], repeat)
+
+
+def sample_design_jobs(rows, seed=0):
+    #model_features style postings with a high-cardinality categorical kept in the design, like Company_Name would be
+    rng = np.random.default_rng(seed)
+    jobs = pd.DataFrame({'Rating': rng.integers(10, 50, rows) / 10,
+                         'Years_Founded': rng.integers(1, 150, rows),
+                         'python': rng.integers(0, 2, rows),
+                         'Size': np.array(SIZES[:-1], dtype=object)[rng.integers(0, len(SIZES) - 1, rows)],
+                         'Revenue': sample_revenues(rows, seed).fillna(REVENUE_LABELS[0]).to_numpy(),
+                         'Employer': np.char.add('employer ', rng.integers(0, max(rows // 20, 2), rows).astype(str))})
+    jobs[models.TARGET] = (60 + 10 * jobs['Rating'] + 15 * jobs['python'] + jobs['Employer'].str.len()
+                           + rng.normal(0, 10, rows))
+    return jobs
+
+
+def legacy_dense_ols(jobs):
+    #The df_dummy frame and statsmodels OLS of code.py, kept as the baseline
+    X, y = models.design_xy(models.design_frame(jobs))
+    train, test = models.split_rows(len(y), 10)
+    fitted = models.fit_ols(X.iloc[train], y.iloc[train])
+    return np.asarray(fitted.predict(X.iloc[test]), dtype=np.float64), fitted.rsquared, fitted.rsquared_adj
+
+
+def sparse_ols(jobs):
+    design = models.design_matrix(jobs)
+    train, test = models.split_rows(len(design.y), 10)
+    fitted = models.fit_ols(design.X[train], design.y.iloc[train])
+    return fitted.predict(design.X[test]), fitted.rsquared, fitted.rsquared_adj
+
+
+def bench_ols(rows, repeat=3):
+    jobs = sample_design_jobs(rows)
+
+    expected = legacy_dense_ols(jobs)
+    result = sparse_ols(jobs)
+    np.testing.assert_allclose(result[0], expected[0], rtol=1e-6)
+    np.testing.assert_allclose(result[1:], expected[1:], rtol=1e-6)
+
+    return compare('ols', jobs, [('dense statsmodels', legacy_dense_ols), ('sparse lsmr', sparse_ols)], repeat)
+
+
+#Libraries the stages import on first use, imported before timing so the stages are timed warm
+STAGE_LIBRARIES = ['scipy.sparse', 'sklearn.model_selection', 'sklearn.feature_selection', 'sklearn.tree',
+                   'sklearn.ensemble', 'statsmodels.api', 'xgboost']
+
+
+def run_stages(path, rows, names=None, until='evaluate'):
+    """Run the pipeline stages on ``path`` in order up to ``until``, timing each one.
+
+    Nothing is cached; a stage's value is dropped once every stage reading
+    it has run, as a real run would.
+    """
+    for library in STAGE_LIBRARIES:
+        __import__(library)
+
+    graph = pipeline.build_graph(names)
+    params = dict(pipeline.DEFAULT_PARAMS, path=path)
+    order = list(graph)[:list(graph).index(until) + 1]
+    readers = {name: sum(name in graph[later].inputs for later in order) for name in order}
+
+    values, results = {}, []
+    for name in order:
+        stage = graph[name]
+        args = [values[upstream] for upstream in stage.inputs] + [params[param] for param in stage.params]
+        with RssSampler() as rss:
+            start = time.perf_counter()
+            values[name] = stage.func(*args)
+            seconds = time.perf_counter() - start
+        del args
+        results.append({'rows': rows, 'stage': name, 'seconds': seconds, 'rows_per_sec': rows / seconds,
+                        'peak_rss_mb': rss.peak / 2 ** 20})
+        for upstream in stage.inputs:
+            readers[upstream] -= 1
+            if readers[upstream] == 0:
+                del values[upstream]
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_scaling(sizes, data_dir, words=300, names=None, until='evaluate'):
+    """``run_stages`` on synthetic postings of each size, each size in a fresh process so peak RSS starts clean."""
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for rows in sizes:
+        path = os.path.join(data_dir, 'synthetic-{}-{}.csv'.format(rows, words))
+        if not os.path.exists(path):
+            synthetic.write_postings(path, rows, words=words)
+        with context.Pool(1) as pool:
+            results.extend(pool.apply(run_stages, (path, rows, names, until)))
+    return pd.DataFrame(results)
+
+
+def scaling_report(results, words):
+    return {'version': __version__,
+            'commit': _git_commit(),
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'words': words,
+            'results': results.to_dict(orient='records')}
+
+
+def compare_reports(results, baseline):
+    """Speedup and peak RSS ratio of ``results`` against the ``baseline`` report, per size and stage."""
+    old = pd.DataFrame(baseline['results'])[['rows', 'stage', 'seconds', 'peak_rss_mb']]
+    merged = results.merge(old, on=['rows', 'stage'], suffixes=('', '_baseline'))
+    merged['speedup'] = merged['seconds_baseline'] / merged['seconds']
+    merged['rss_ratio'] = merged['peak_rss_mb'] / merged['peak_rss_mb_baseline']
+    return merged[['rows', 'stage', 'seconds_baseline', 'seconds', 'speedup', 'peak_rss_mb_baseline', 'peak_rss_mb',
+                   'rss_ratio']]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--suite', choices=['legacy', 'scaling'], default='legacy')
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000, 10000000])
+    parser.add_argument('--words', type=int, default=300, help='average words per synthetic description')
+    parser.add_argument('--models', nargs='+', default=None, help='models trained by the scaling suite')
+    parser.add_argument('--until', default='evaluate', help='last stage run by the scaling suite')
+    parser.add_argument('--data-dir', default='../bench/data', help='where the synthetic CSVs are kept')
+    parser.add_argument('--json', help='write the scaling results to this file')
+    parser.add_argument('--baseline', help='scaling results of an earlier version to compare with')
+    args = parser.parse_args(argv)
+
+    if args.suite == 'legacy':
+        results = pd.concat([bench_salary(args.rows, args.repeat),
+                             bench_size(args.rows, args.repeat),
+                             bench_revenue(args.rows, args.repeat),
+                             bench_text(args.rows, args.repeat),
+                             bench_itemsets(args.rows, args.repeat),
+                             bench_anova(args.rows, args.repeat),
+                             bench_ttests(args.rows, args.repeat),
+                             bench_titles(args.rows, args.repeat),
+                             bench_ols(args.rows, args.repeat)], ignore_index=True)
+        print(results.to_string(index=False))
+        return
+
+    results = bench_scaling(args.sizes, args.data_dir, args.words, args.models, args.until)
+    print(results.to_string(index=False))
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or '.', exist_ok=True)
+        with open(args.json, 'w') as f:
+            json.dump(scaling_report(results, args.words), f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            print(compare_reports(results, json.load(f)).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,8 @@
+"""Salary prediction for data science jobs scraped from Glassdoor.
+
+Stages live in separate modules: load, clean, features, eda and models,
+plus cache for the cleaned frames. ``python -m salary_prediction`` runs
+them from the command line. Only numpy and pandas are imported up front;
+plotting, statistics and modelling libraries load when a stage needs them.
+"""
+__version__ = '0.1.0'
@@ -0,0 +1,131 @@
+"""Content-addressed cache of cleaned frames and other pipeline results.
+
+Frames are stored as uncompressed Feather (Arrow IPC) files named by a key
+hashed from the input files, the code that produced them and
+``CACHE_VERSION``. They are read through a memory map, so the Arrow buffers
+are pages of the file rather than a second copy in memory. The frame built
+from them is an ordinary, writable pandas copy. Other results (fill
+values, fitted models) are pickled next to them. Least recently used
+entries are evicted when the cache grows over ``MAX_CACHE_BYTES``.
+"""
+import hashlib
+import os
+import pickle
+
+CACHE_DIR = '../cache'
+
+#Bump to invalidate every entry, e.g. after changing a cleaning setting outside the hashed code
+CACHE_VERSION = 1
+
+MAX_CACHE_BYTES = 4 * 1024 ** 3
+
+
+def file_digest(path, blocksize=1 << 20):
+    """SHA-256 of a file's contents, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_key(files=(), modules=(), extra=()):
+    """Key for a cache entry from input ``files``, the source of ``modules`` and ``extra`` strings."""
+    digest = hashlib.sha256(str(CACHE_VERSION).encode())
+    for path in files:
+        digest.update(file_digest(path).encode())
+    for module in modules:
+        digest.update(file_digest(module.__file__).encode())
+    for part in extra:
+        digest.update(str(part).encode())
+    return digest.hexdigest()[:32]
+
+
+#File suffixes of the cache entries
+ENTRY_SUFFIXES = ('.feather', '.pkl')
+
+
+def _path(name, key, cache_dir, suffix='.feather'):
+    return os.path.join(cache_dir, '{}-{}{}'.format(name, key, suffix))
+
+
+def has_entry(name, key, cache_dir=CACHE_DIR):
+    """Whether there is a cached frame or object for ``name`` and ``key``."""
+    return any(os.path.exists(_path(name, key, cache_dir, suffix)) for suffix in ENTRY_SUFFIXES)
+
+
+def read_cache(name, key, cache_dir=CACHE_DIR):
+    """Return the cached frame for ``name`` and ``key``, or None when there is none."""
+    from pyarrow import feather
+
+    path = _path(name, key, cache_dir)
+    if not os.path.exists(path):
+        return None
+    #to_pandas copies: zero-copy columns would be read-only views of the file
+    frame = feather.read_table(path, memory_map=True).to_pandas()
+    #mark as recently used for eviction
+    os.utime(path)
+    return frame
+
+
+def write_cache(frame, name, key, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Store ``frame`` under ``name`` and ``key``, then evict old entries over ``max_bytes``."""
+    import pyarrow as pa
+    from pyarrow import feather
+
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _path(name, key, cache_dir)
+    tmp = path + '.tmp'
+    feather.write_feather(pa.Table.from_pandas(frame, preserve_index=True), tmp, compression='uncompressed')
+    os.replace(tmp, path)
+    evict(cache_dir, max_bytes)
+    return path
+
+
+def read_object(name, key, cache_dir=CACHE_DIR):
+    """Return the cached object for ``name`` and ``key``, or None when there is none."""
+    path = _path(name, key, cache_dir, '.pkl')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        obj = pickle.load(f)
+    os.utime(path)
+    return obj
+
+
+def write_object(obj, name, key, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Pickle ``obj`` under ``name`` and ``key``, then evict old entries over ``max_bytes``."""
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _path(name, key, cache_dir, '.pkl')
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    evict(cache_dir, max_bytes)
+    return path
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+    """Delete the least recently used entries until the cache fits in ``max_bytes``."""
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith(ENTRY_SUFFIXES):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+    total = sum(size for _, size, _ in entries)
+    #never evict the newest entry, even when it alone is over the limit
+    for _, size, path in sorted(entries)[:-1]:
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+
+def cached_frame(name, key, build, cache_dir=CACHE_DIR):
+    """Return the cached frame for ``name`` and ``key``, building and caching it on a miss."""
+    frame = read_cache(name, key, cache_dir)
+    if frame is None:
+        frame = build()
+        write_cache(frame, name, key, cache_dir)
+    return frame
@@ -0,0 +1,422 @@
+"""Column-at-once cleaning helpers for the Glassdoor jobs data.
+
+These replace the per-row ``iloc`` loops the notebook used to run with vectorized
+operations, so the same parsing can be reused when scoring new postings.
+"""
+import collections
+import multiprocessing
+import re
+
+import numpy as np
+import pandas as pd
+
+from . import instrument
+from .dedup import fingerprints
+from .features import SKILL_KEYWORDS, SKILL_TYPES, build_skill_index, extract_skills, keyword_flags
+
+#The Equal Opportunity tagline may skew our results, its words are removed from the descriptions
+EQUAL_EMP = 'Kelly is an equal opportunity employer committed to employing a diverse workforce, including, but not limited to, minorities, females, individuals with disabilities, protected veterans, sexual orientation, gender identity. Equal Employment Opportunity is The Law.'
+EQUAL_EMP = EQUAL_EMP.lower().split(' ')
+
+_NON_LETTERS = re.compile("[^a-zA-Z']")
+
+#Description chunks queued per worker process
+CHUNKS_PER_WORKER = 2
+
+#"$56K-$97K (Glassdoor est.)", "$79K-$131K(Employer est.)", "$17-$24 Per Hour(Glassdoor est.)"
+_SALARY_RANGE = r'^\s*\$?(\d+(?:\.\d+)?)(K?)\s*-\s*\$?(\d+(?:\.\d+)?)(K?)'
+
+
+def _normalize_chunk(texts, stopwords):
+    return [' '.join(word for word in _NON_LETTERS.sub(' ', text.lower()).split() if word not in stopwords)
+            for text in texts]
+
+
+def normalize_descriptions(texts, stopwords=(), n_jobs=1, chunksize=10000):
+    """Lowercase, keep only letters and apostrophes, and drop ``stopwords``.
+
+    Every description is cleaned and re-joined in one pass, with the stop
+    words in a set. With ``n_jobs > 1`` the texts are sent to a process pool
+    in chunks of ``chunksize``. At most ``CHUNKS_PER_WORKER`` chunks per
+    worker are in flight, so only those are pickled and held at once.
+    """
+    texts = pd.Series(texts)
+    stopwords = frozenset(stopwords)
+
+    if n_jobs == 1:
+        values = _normalize_chunk(texts, stopwords)
+    else:
+        values = []
+        with multiprocessing.Pool(n_jobs) as pool:
+            #a bounded window of chunks in flight, collected in input order
+            pending = collections.deque()
+            for i in range(0, len(texts), chunksize):
+                pending.append(pool.apply_async(_normalize_chunk, (texts.iloc[i:i + chunksize].tolist(), stopwords)))
+                if len(pending) >= n_jobs * CHUNKS_PER_WORKER:
+                    values.extend(pending.popleft().get())
+            while pending:
+                values.extend(pending.popleft().get())
+
+    return pd.Series(values, index=texts.index, name=texts.name)
+
+
+def parse_salary_estimate(salary):
+    """Split ``Salary_Estimate`` strings into numeric salary columns.
+
+    Returns a frame indexed like ``salary`` with float ``Min_Salary``,
+    ``Max_Salary`` and ``Est_Salary`` columns and a boolean ``Per_Hour``
+    column. The "(Glassdoor est.)" / "(Employer est.)" suffixes are ignored.
+    As in the original loop, a bound without a "K" parses to 0; missing
+    estimates and per hour estimates give NaN.
+    """
+    salary = pd.Series(salary)
+    parts = salary.str.extract(_SALARY_RANGE)
+    per_hour = salary.str.contains('Per Hour', regex=False).fillna(False).astype(bool)
+
+    bounds = []
+    for num, unit in ((0, 1), (2, 3)):
+        value = parts[num].astype(float).to_numpy()
+        value = np.where(parts[unit].to_numpy() == 'K', value, 0.0)
+        value[parts[num].isna().to_numpy() | per_hour.to_numpy()] = np.nan
+        bounds.append(value)
+
+    return pd.DataFrame({'Min_Salary': bounds[0],
+                         'Max_Salary': bounds[1],
+                         'Est_Salary': (bounds[0] + bounds[1]) / 2,
+                         'Per_Hour': per_hour.to_numpy()},
+                        index=salary.index)
+
+
+def _max_employees(label):
+    #"1 to 50 employees" -> 50, "10000+ employees" -> 10000, "Unknown" -> NaN
+    try:
+        if '+' in label:
+            return float(label.replace('+', '').replace('employees', '').strip())
+        if 'employees' in label:
+            return float(label.replace('employees', '').strip().split('to')[1])
+    except (ValueError, IndexError):
+        pass
+    return np.nan
+
+
+def parse_employee_size(size):
+    """Map ``Size`` labels to the maximum number of employees.
+
+    Each distinct label is parsed once and the results are broadcast back
+    through the factorized codes, so the cost depends on the number of
+    distinct labels rather than rows. Missing, "Unknown" and unparseable
+    labels give NaN.
+    """
+    size = pd.Series(size)
+    codes, labels = pd.factorize(size)
+    table = np.append(np.array([_max_employees(label) for label in labels], dtype=float), np.nan)
+    #factorize marks missing values with -1, which picks the trailing NaN
+    return pd.Series(table[codes], index=size.index, name='MaxEmpSize')
+
+
+#Glassdoor revenue buckets as they appear in the scraped data
+REVENUE_LABELS = ['Unknown / Non-Applicable',
+                  'Less than $1 million (USD)',
+                  '$1 to $5 million (USD)',
+                  '$5 to $10 million (USD)',
+                  '$10 to $25 million (USD)',
+                  '$25 to $50 million (USD)',
+                  '$50 to $100 million (USD)',
+                  '$100 to $500 million (USD)',
+                  '$500 million to $1 billion (USD)',
+                  '$1 to $2 billion (USD)',
+                  '$2 to $5 billion (USD)',
+                  '$5 to $10 billion (USD)',
+                  '$10+ billion (USD)']
+
+#Short labels for the revenue buckets used in the reports
+REVENUE_USD = {'Unknown / Non-Applicable': 'Unknown',
+               'Less than $1 million (USD)': '<1 million',
+               '$1 to $5 million (USD)': '1-5 million',
+               '$5 to $10 million (USD)': '5-10 million',
+               '$10 to $25 million (USD)': '10-25 million',
+               '$25 to $50 million (USD)': '25-50 million',
+               '$50 to $100 million (USD)': '50-100 million',
+               '$100 to $500 million (USD)': '100-500 million',
+               '$500 million to $1 billion (USD)': '0.5-1 billion',
+               '$1 to $2 billion (USD)': '1-2 billion',
+               '$2 to $5 billion (USD)': '2-5 billion',
+               '$5 to $10 billion (USD)': '5-10 billion',
+               '$10+ billion (USD)': '10+ billion'}
+
+#Multipliers of the original MaxRevenue loop, kept so the feature values do not change
+REVENUE_SCALE = {'million': 100000000, 'billion': 1000000000}
+
+_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+_UNIT = re.compile(r'million|billion')
+
+
+def _max_revenue(label):
+    #Upper bound of the bucket: the last amount with the last unit, "$500 million to $1 billion" -> 1 billion
+    numbers = _NUMBER.findall(label)
+    units = _UNIT.findall(label)
+    if not numbers or not units:
+        return np.nan
+    return float(numbers[-1]) * REVENUE_SCALE[units[-1]]
+
+
+REVENUE_TABLE = {label: _max_revenue(label) for label in REVENUE_LABELS}
+
+
+def parse_revenue(revenue):
+    """Map ``Revenue`` buckets to the maximum revenue in USD.
+
+    Known buckets come from ``REVENUE_TABLE``; any other label is parsed
+    with the regex fallback. Values are broadcast through the factorized
+    codes, so each row costs one array take. Labels that missed the table
+    are reported in ``result.attrs['table_misses']`` as ``{label: rows}``.
+    """
+    revenue = pd.Series(revenue)
+    codes, labels = pd.factorize(revenue)
+
+    table = np.empty(len(labels) + 1)
+    misses = []
+    for i, label in enumerate(labels):
+        if label in REVENUE_TABLE:
+            table[i] = REVENUE_TABLE[label]
+        else:
+            table[i] = _max_revenue(label)
+            misses.append(i)
+    table[-1] = np.nan
+
+    result = pd.Series(table[codes], index=revenue.index, name='MaxRevenue')
+    counts = np.bincount(codes[codes >= 0], minlength=len(labels)) if misses else None
+    result.attrs['table_misses'] = {labels[i]: int(counts[i]) for i in misses}
+    return result
+
+
+#Columns added by the cleaning, in the order the notebook created them
+DERIVED_COLUMNS = (['Job_Domain', 'Job Role', 'Min_Salary', 'Max_Salary', 'MaxEmpSize', 'refined_skills',
+                    'State_Location', 'City', 'State', 'HQCity', 'HQState', 'Est_Salary', 'Years_Founded',
+                    'MaxRevenue'] + list(SKILL_KEYWORDS) + ['Revenue_USD'])
+
+
+def clean_text(jobs):
+    """First cleaning stage: missing values, salary rows and the text columns.
+
+    Turns -1 into NaN, drops the mostly empty columns and the rows without a
+    yearly salary estimate, normalizes the descriptions and splits the job
+    domain/role, city/state and company name columns. ``Salary_Estimate`` is
+    parsed once here and replaced by the salary columns.
+    """
+    #Replacing -1 with NA's and removing the mostly empty Easy_apply and Competitors columns
+    jobs = jobs.replace([-1, '-1'], np.nan)
+    jobs = jobs.drop(columns=['Easy_apply', 'Competitors'], errors='ignore')
+
+    #Keeping only rows with a yearly salary estimate, new postings to score have none
+    if 'Salary_Estimate' in jobs:
+        jobs['Salary_Estimate'] = jobs['Salary_Estimate'].replace('', np.nan)
+        missing = jobs['Salary_Estimate'].isna()
+        salaries = parse_salary_estimate(jobs['Salary_Estimate'])
+        per_hour = salaries['Per_Hour']
+        instrument.count('missing_salary', missing.sum())
+        instrument.count('per_hour', (per_hour & ~missing).sum())
+        keep = ~missing & ~per_hour
+        jobs = jobs[keep].drop(columns=['Salary_Estimate'])
+        for col in ['Min_Salary', 'Max_Salary', 'Est_Salary']:
+            jobs[col] = salaries.loc[keep, col]
+
+    jobs['Job_Description'] = normalize_descriptions(jobs['Job_Description'].fillna(''), EQUAL_EMP)
+
+    #Splitting information from job domain and role
+    title = jobs['job_title']
+    jobs['Job_Domain'] = title.str.extract('(,.*)', expand=False).str.replace(',', '', regex=False).fillna(title)
+    jobs['Job Role'] = title.str.extract('(.*,)', expand=False).str.replace(',', '', regex=False).fillna(title)
+
+    #Separate state, 'City' & 'State' from the job 'Location' and the 'Headquarters'
+    jobs['State_Location'] = jobs['Location'].str[-2:]
+    city = jobs['Location'].str.split(', ', n=1, expand=True).reindex(columns=[0, 1])
+    hq = jobs['Headquarters'].str.split(', ', n=1, expand=True).reindex(columns=[0, 1])
+    jobs['City'], jobs['State'] = city[0], city[1]
+    jobs['HQCity'], jobs['HQState'] = hq[0], hq[1]
+
+    #Cleaning up duplicated city names in state names
+    jobs['State'] = jobs['State'].replace({'Arapahoe, CO': 'CO', 'Los Angeles, CA': 'CA'})
+    jobs['HQState'] = jobs['HQState'].replace('NY (US), NY', 'NY')
+
+    #Removing the rating from the company name
+    jobs['Company_Name'] = jobs['Company_Name'].astype(str).str.replace(r'\n.*', '', regex=True)
+    return jobs
+
+
+def parse_numerics(jobs, revenue_misses=None):
+    """Second cleaning stage: salary, company size, company age and revenue columns.
+
+    Revenue labels missing from the lookup table are added to the
+    ``revenue_misses`` Counter when one is given. The salary columns come
+    from ``clean_text``; a ``Salary_Estimate`` it has not parsed is parsed here.
+    """
+    jobs = jobs.copy()
+    if 'Salary_Estimate' in jobs:
+        salaries = parse_salary_estimate(jobs['Salary_Estimate'])
+        jobs['Min_Salary'] = salaries['Min_Salary']
+        jobs['Max_Salary'] = salaries['Max_Salary']
+        jobs['Est_Salary'] = salaries['Est_Salary']
+    jobs['MaxEmpSize'] = parse_employee_size(jobs['Size'])
+    jobs['Years_Founded'] = 2022 - jobs['Founded']
+
+    max_revenue = parse_revenue(jobs['Revenue'])
+    jobs['MaxRevenue'] = max_revenue
+    if revenue_misses is not None:
+        revenue_misses.update(max_revenue.attrs['table_misses'])
+
+    #Short revenue labels used in the reports
+    jobs['Revenue_USD'] = jobs['Revenue'].map(REVENUE_USD)
+    return jobs.drop(columns=['Salary_Estimate'], errors='ignore')
+
+
+def add_skills(jobs, skill_index=None):
+    """Last cleaning stage: skills and skill flags from the normalized descriptions.
+
+    Drops ``Job_Description`` and puts the columns in the notebook order.
+    """
+    if skill_index is None:
+        skill_index = build_skill_index(SKILL_TYPES)
+
+    jobs = jobs.copy()
+    jobs['refined_skills'] = extract_skills(jobs['Job_Description'], skill_index)
+    flags = keyword_flags(jobs['Job_Description'], list(SKILL_KEYWORDS.values()))
+    for i, col in enumerate(SKILL_KEYWORDS):
+        jobs[col] = flags[:, i]
+    jobs = jobs.drop(columns=['Job_Description'])
+
+    derived = [col for col in DERIVED_COLUMNS if col in jobs]
+    return jobs[[col for col in jobs if col not in derived] + derived]
+
+
+def clean_jobs(jobs, revenue_misses=None, skill_index=None):
+    """Apply the row-level cleaning to a frame of raw postings.
+
+    Runs ``clean_text``, ``parse_numerics`` and ``add_skills``. Postings
+    without a ``Salary_Estimate`` column (new postings to score) are all
+    kept and get no salary columns.
+    Works on any subset of rows, so it can be applied chunk by chunk.
+    """
+    with instrument.stage('text', jobs) as event:
+        jobs = clean_text(jobs)
+        event.output(jobs)
+    with instrument.stage('numerics', jobs) as event:
+        jobs = parse_numerics(jobs, revenue_misses)
+        event.output(jobs)
+    with instrument.stage('skills', jobs) as event:
+        jobs = add_skills(jobs, skill_index)
+        event.output(jobs)
+    return jobs
+
+
+def clean_chunks(chunks, revenue_misses=None):
+    """Clean an iterable of raw chunks, e.g. ``load_jobs(path, chunksize=...)``.
+
+    Yields one cleaned frame per chunk. Repeated postings are dropped across
+    chunks by remembering a 64-bit hash of ``DEDUP_COLUMNS`` for every row
+    seen, keeping the first occurrence like ``drop_duplicates``.
+    """
+    seen = set()
+    skill_index = build_skill_index(SKILL_TYPES)
+    for chunk in chunks:
+        with instrument.stage('dedup', chunk) as event:
+            hashes = fingerprints(chunk).tolist()
+            first = np.zeros(len(hashes), dtype=bool)
+            for i, h in enumerate(hashes):
+                if h not in seen:
+                    seen.add(h)
+                    first[i] = True
+            chunk = chunk[first]
+            instrument.count('duplicates', len(first) - len(chunk))
+            event.output(chunk)
+        yield clean_jobs(chunk, revenue_misses, skill_index)
+
+
+def prepare_jobs(path, chunksize=None, revenue_misses=None):
+    """Load, deduplicate and clean the postings in ``path``.
+
+    With ``chunksize`` the file is streamed through ``clean_chunks`` so
+    only one raw chunk is in memory at a time.
+    """
+    from .load import load_jobs
+
+    chunks = load_jobs(path, chunksize=chunksize) if chunksize else [load_jobs(path)]
+    return pd.concat(clean_chunks(chunks, revenue_misses))
+
+
+#How the missing values left after cleaning are filled
+FILL_STRATEGY = {'Rating': 'mean',
+                 'Headquarters': 'mode',
+                 'Industry': 'mode',
+                 'Sector': 'mode',
+                 'Founded': 'median',
+                 'MaxRevenue': 'median',
+                 'Years_Founded': 'median',
+                 'Type_ownership': 'mode',
+                 'Size': 'mode',
+                 'State': 'mode',
+                 'HQCity': 'mode',
+                 'HQState': 'mode',
+                 'MaxEmpSize': 'median'}
+
+
+def fit_fill_values(jobs, strategy=FILL_STRATEGY):
+    """Compute the value used to fill each column of ``strategy`` on the training postings."""
+    values = {}
+    for col, how in strategy.items():
+        if how == 'mode':
+            values[col] = jobs[col].mode()[0]
+        else:
+            values[col] = getattr(jobs[col], how)()
+    return values
+
+
+def impute(jobs, fill_values):
+    """Fill missing values with the values from ``fit_fill_values``."""
+    return jobs.fillna(fill_values)
+
+
+#String columns with at most this share of distinct values are stored as categories
+CATEGORY_RATIO = 0.5
+
+
+def _compact_column(values):
+    if values.dtype == object:
+        if (pd.api.types.infer_dtype(values, skipna=True) == 'string'
+                and values.nunique() <= CATEGORY_RATIO * len(values)):
+            return values.astype('category')
+        return values
+    if pd.api.types.is_bool_dtype(values) or not pd.api.types.is_numeric_dtype(values):
+        return values
+    if pd.api.types.is_integer_dtype(values):
+        return pd.to_numeric(values, downcast='unsigned' if values.min() >= 0 else 'integer')
+    #floats: whole numbers without missing values become ints, the rest float32 when no value changes
+    if not values.hasnans and (values % 1 == 0).all():
+        return _compact_column(values.astype(np.int64))
+    narrow = values.astype(np.float32)
+    if np.array_equal(narrow.to_numpy(dtype=np.float64), values.to_numpy(), equal_nan=True):
+        return narrow
+    return values
+
+
+def frame_bytes(frame):
+    """Memory held by ``frame``, strings included."""
+    return int(frame.memory_usage(deep=True).sum())
+
+
+def compact(jobs, sizes=None):
+    """Store ``jobs`` in the smallest dtypes that keep every value.
+
+    Numbers go to the narrowest int, or to float32 when no value changes;
+    the 0/1 skill flags stay uint8. String columns with repeated values
+    (company, industry, sector, city, state, size, revenue, titles...)
+    become categories. The bytes before and after go to the ``sizes`` dict
+    when one is given, and to the stage event.
+    """
+    before = frame_bytes(jobs)
+    jobs = pd.DataFrame({col: _compact_column(jobs[col]) for col in jobs}, index=jobs.index)
+    after = frame_bytes(jobs)
+    instrument.annotate(bytes_before=before, bytes_after=after)
+    if sizes is not None:
+        sizes.update(before=before, after=after)
+    return jobs
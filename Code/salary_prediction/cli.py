@@ -0,0 +1,191 @@
+"""Command line interface.
+
+    python -m salary_prediction clean   [--input CSV] [--chunksize N] [--near-duplicates J] [--output FILE]
+    python -m salary_prediction train   [--input CSV] [--near-duplicates J] [--models ...] [--param NAME=VALUE ...] [--jobs N] [--timeout S]
+                                        [--sparse] [--save NAME] [--model-out PKL]
+    python -m salary_prediction predict INPUT [--model PKL] [--output FILE] [--chunksize N] [--workers N]
+    python -m salary_prediction report  [--input CSV] [--near-duplicates J] [--out-dir DIR]
+    python -m salary_prediction serve   [--model PKL] [--host HOST] [--port N] [--max-batch N] [--max-wait-ms MS]
+
+Run from the Code folder so the default paths resolve. Each subcommand only
+imports what its stage needs; predict never imports a plotting library.
+clean, train and report run the stages of ``pipeline`` and only redo the
+stages whose code, parameters or inputs changed since the last run.
+--events FILE writes a JSON line per stage (timings, memory, rows in and
+out); --profile STAGE adds a cProfile and tracemalloc breakdown of STAGE.
+"""
+import argparse
+import os
+import sys
+from collections import Counter
+
+from . import cache, clean, dedup, features, instrument, load, models, pipeline
+
+
+def _print_executed(executed):
+    print('Ran stages:', ', '.join(executed) if executed else 'none, all cached', file=sys.stderr)
+
+
+def cleaned_jobs(path, chunksize=None, cache_dir=cache.CACHE_DIR, near_duplicates=None):
+    """Cleaned postings of ``path``, from the cache when the file and the cleaning code are unchanged.
+
+    Without ``chunksize`` this is the ``skills`` stage of the pipeline; with
+    it the file is streamed through ``clean.prepare_jobs``, which only drops
+    exact duplicates.
+    """
+    if not chunksize:
+        executed = []
+        jobs = pipeline.run(['skills'], {'path': path, 'near_duplicates': near_duplicates}, cache_dir=cache_dir,
+                            executed=executed)['skills']
+        _print_executed(executed)
+        return jobs
+    if near_duplicates is not None:
+        sys.exit('--near-duplicates compares postings across the whole file, drop --chunksize')
+
+    key = cache.cache_key(files=[path], modules=[load, dedup, clean, features])
+    misses = Counter()
+    jobs = cache.cached_frame('jobs', key, lambda: clean.prepare_jobs(path, chunksize, misses), cache_dir)
+    if misses:
+        print('Revenue labels missing from the lookup table:', dict(misses), file=sys.stderr)
+    return jobs
+
+
+def _write(frame, path):
+    if path.endswith('.parquet'):
+        frame.to_parquet(path)
+    elif path.endswith('.feather'):
+        frame.reset_index().to_feather(path)
+    else:
+        frame.to_csv(path)
+
+
+def cmd_clean(args):
+    jobs = cleaned_jobs(args.input, args.chunksize, args.cache_dir, args.near_duplicates)
+    print('Cleaned postings:', jobs.shape)
+    if args.output:
+        _write(jobs, args.output)
+
+
+def cmd_train(args):
+    names = args.models or list(models.MODELS)
+    if args.save is None:
+        save = 'xgboost' if 'xgboost' in names else names[-1]
+    elif args.save in names:
+        save = args.save
+    else:
+        sys.exit('--save {} is not among the trained models, choose one of: {}'.format(args.save, ', '.join(names)))
+    params = pipeline.parse_overrides(args.param)
+    params['path'] = args.input
+    if args.near_duplicates is not None:
+        params['near_duplicates'] = args.near_duplicates
+    if args.sparse:
+        params['sparse'] = True
+
+    executed, failed = [], {}
+    outputs = pipeline.run(['evaluate', 'train_' + save, 'fill_values', 'vocabularies', 'category_modes', 'encode'],
+                           params, names, args.cache_dir, executed,
+                           cpu_budget=args.jobs if args.jobs > 1 else None, timeout=args.timeout, failed=failed)
+    _print_executed(executed)
+    for name, error in failed.items():
+        print('{} was not trained: {}'.format(name, error), file=sys.stderr)
+    if 'train_' + save not in outputs:
+        sys.exit('No {} model to save'.format(save))
+    print(outputs['evaluate'].to_string(index=False))
+
+    path = models.save_pipeline(outputs['train_' + save], outputs['fill_values'], outputs['category_modes'],
+                                pipeline.feature_columns(outputs['encode']), outputs['vocabularies'],
+                                args.model_out, sparse=isinstance(outputs['encode'], models.Design))
+    print('Saved the {} pipeline to {}'.format(save, path))
+
+
+def cmd_predict(args):
+    from . import score
+
+    rows = score.score_file(args.model, args.input, args.output, args.chunksize, args.workers)
+    print('Scored {} postings into {}'.format(rows, args.output))
+
+
+def cmd_report(args):
+    from . import eda
+
+    jobs = cleaned_jobs(args.input, args.chunksize, args.cache_dir, args.near_duplicates)
+    jobs = clean.impute(jobs, clean.fit_fill_values(jobs))
+    eda.report(jobs, args.out_dir)
+    print('Report written to', args.out_dir)
+
+
+def cmd_serve(args):
+    from . import serve
+
+    serve.serve(args.model, args.host, args.port, args.max_batch, args.max_wait_ms / 1000)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='salary_prediction', description='Salary prediction for data science jobs.')
+    parser.add_argument('--events', metavar='FILE', help="append per-stage events to this JSON-lines file, '-' for stderr")
+    parser.add_argument('--profile', metavar='STAGE', action='append', default=[],
+                        help='also profile this stage with cProfile and tracemalloc (needs --events)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def with_input(command, chunked=True):
+        command.add_argument('--input', default=load.JOBS_PATH, help='raw postings CSV')
+        if chunked:
+            command.add_argument('--chunksize', type=int, default=None,
+                                 help='stream the CSV in chunks of this many rows')
+        command.add_argument('--near-duplicates', type=float, default=None, metavar='J',
+                             help='also drop postings whose shingles have Jaccard similarity J or more '
+                                  'with an earlier one, e.g. 0.9')
+        command.add_argument('--cache-dir', default=cache.CACHE_DIR)
+        return command
+
+    command = with_input(commands.add_parser('clean', help='clean the postings into the cache'))
+    command.add_argument('--output', help='also write the cleaned postings (.csv, .parquet or .feather)')
+    command.set_defaults(func=cmd_clean)
+
+    command = with_input(commands.add_parser('train', help='train and compare the models, save one for predict'),
+                         chunked=False)
+    command.add_argument('--models', nargs='+', choices=list(models.MODELS), default=None)
+    command.add_argument('--param', action='append', metavar='NAME=VALUE',
+                         help='override a parameter, e.g. test_size=0.25 or xgboost.max_depth=10')
+    command.add_argument('--jobs', type=int, default=os.cpu_count(),
+                         help='CPU budget for fitting the models concurrently, 1 fits them one after the other')
+    command.add_argument('--timeout', type=float, default=None, help='seconds each model may take to fit')
+    command.add_argument('--sparse', action='store_true',
+                         help='train on a sparse CSR design matrix instead of the dense df_dummy frame')
+    command.add_argument('--save', choices=list(models.MODELS), default=None,
+                         help='model saved for predict, by default xgboost or else the last of --models')
+    command.add_argument('--model-out', default=models.MODEL_PATH)
+    command.set_defaults(func=cmd_train)
+
+    command = commands.add_parser('predict', help='score new postings with a saved pipeline')
+    command.add_argument('input', help='postings CSV or Parquet file to score')
+    command.add_argument('--model', default=models.MODEL_PATH)
+    command.add_argument('--output', default='predictions.csv', help='predictions CSV or Parquet file')
+    command.add_argument('--chunksize', type=int, default=100000, help='postings read and scored at a time')
+    command.add_argument('--workers', type=int, default=os.cpu_count(),
+                         help='processes scoring chunks concurrently, 1 scores them in this process')
+    command.set_defaults(func=cmd_predict)
+
+    command = with_input(commands.add_parser('report', help='write the EDA figures and tables'))
+    command.add_argument('--out-dir', default='../reports')
+    command.set_defaults(func=cmd_report)
+
+    command = commands.add_parser('serve', help='serve salary estimates of single postings over HTTP')
+    command.add_argument('--model', default=models.MODEL_PATH)
+    command.add_argument('--host', default='127.0.0.1')
+    command.add_argument('--port', type=int, default=8000)
+    command.add_argument('--max-batch', type=int, default=64, help='most postings predicted in one call')
+    command.add_argument('--max-wait-ms', type=float, default=2.0,
+                         help='how long a posting waits for others to share its predict call')
+    command.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.events:
+        instrument.configure(args.events, deep=args.profile)
+    try:
+        args.func(args)
+    finally:
+        instrument.configure(None)
@@ -0,0 +1,105 @@
+"""Salary and openings aggregates of the postings for many groupings at once.
+
+The openings/salary reports and the firm size heatmaps all group the
+postings by one or a few columns. Each report then needs openings, distinct
+companies, and the mean and spread of the salary per group. ``build_cube``
+factorizes every dimension column once. For each grouping it combines the
+integer codes into group ids and sums the measures with ``np.bincount``. No
+frame is copied or merged, and each grouping costs a pass over a few integer
+arrays. The sums of the salary and of its square are kept, so the mean,
+standard deviation and confidence interval of any group follow from the cube.
+The reports slice the cube, which holds one row per group, and never go back
+to the postings. The groupings led by ``State`` keep one row per company, so
+``regions.region_table`` can roll them up for any set of states, distinct
+companies included.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+#Groupings of the EDA reports, the ones led by State are rolled up into the regional reports
+GROUPINGS = [('Company_Name',), ('Industry',), ('Sector',), ('Location',), ('State_Location',),
+             ('Revenue', 'Revenue_USD'), ('Revenue_USD', 'Size'),
+             ('State', 'Company_Name'), ('State', 'Sector', 'Company_Name'),
+             ('State', 'Revenue_USD', 'Size', 'Company_Name')]
+
+#Measures kept per group: openings (postings with a job title), distinct companies and salary sums
+MEASURES = ['Jobs', 'Companies', 'salary_count', 'salary_sum', 'salary_sumsq']
+
+#Normal quantile of the 95% salary confidence intervals
+Z_95 = 1.959963984540054
+
+Dimension = namedtuple('Dimension', ['codes', 'labels'])
+
+
+def _dimension(values):
+    codes, labels = pd.factorize(values, sort=True)
+    return Dimension(codes, np.asarray(labels, dtype=object))
+
+
+def _aggregate(grouping, dims, jobs_weight, salary, companies):
+    keep = np.logical_and.reduce([dim.codes >= 0 for dim in dims])
+    ids = np.ravel_multi_index([dim.codes[keep] for dim in dims], [len(dim.labels) for dim in dims])
+    #group ids in dimension order, like a sorted groupby
+    groups, inverse = np.unique(ids, return_inverse=True)
+    n = len(groups)
+
+    salary = salary[keep]
+    present = ~np.isnan(salary)
+    salary = np.where(present, salary, 0.0)
+    measures = {'Jobs': np.bincount(inverse, jobs_weight[keep], n).astype(np.int64),
+                'salary_count': np.bincount(inverse, present, n).astype(np.int64),
+                'salary_sum': np.bincount(inverse, salary, n),
+                'salary_sumsq': np.bincount(inverse, salary * salary, n)}
+
+    #distinct (group, company) pairs
+    company = companies.codes[keep]
+    pairs = np.unique(inverse[company >= 0] * len(companies.labels) + company[company >= 0])
+    measures['Companies'] = np.bincount(pairs // len(companies.labels), minlength=n)
+
+    index = pd.MultiIndex.from_arrays([dim.labels[positions] for dim, positions in
+                                       zip(dims, np.unravel_index(groups, [len(dim.labels) for dim in dims]))],
+                                      names=list(grouping))
+    return pd.DataFrame(measures, index=index)[MEASURES]
+
+
+def build_cube(jobs, groupings=GROUPINGS, target='Est_Salary', distinct='Company_Name'):
+    """``{grouping: table}`` of the ``MEASURES`` of every grouping of ``jobs``.
+
+    Each table has one row per observed combination of the grouping
+    columns, indexed by them in sorted order. Postings missing one of them
+    are left out, as in ``groupby``.
+    """
+    names = {name for grouping in groupings for name in grouping}
+    dims = {name: _dimension(jobs[name]) for name in names}
+    companies = dims[distinct] if distinct in dims else _dimension(jobs[distinct])
+    jobs_weight = jobs['job_title'].notna().to_numpy(dtype=np.float64)
+    salary = jobs[target].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    cube = {}
+    for grouping in groupings:
+        cube[tuple(grouping)] = _aggregate(grouping, [dims[name] for name in grouping], jobs_weight, salary,
+                                           companies)
+    return cube
+
+
+def salary_table(cube, grouping):
+    """Table of ``grouping`` with the ``Est_Salary`` mean, standard deviation and 95% interval half-width.
+
+    The grouping columns come back as columns in their table order.
+    """
+    return salary_stats(cube[tuple(grouping)].reset_index())
+
+
+def salary_stats(table):
+    """``table`` with the ``Est_Salary`` mean, ``Salary_SD`` and ``Salary_CI`` derived from its salary sums."""
+    table = table.copy()
+    count = table['salary_count']
+    mean = table['salary_sum'] / count.where(count > 0)
+    #sample variance from the sums, clipped at 0 against rounding
+    variance = ((table['salary_sumsq'] - count * mean ** 2) / (count - 1).where(count > 1)).clip(lower=0)
+    table['Est_Salary'] = mean
+    table['Salary_SD'] = np.sqrt(variance)
+    table['Salary_CI'] = Z_95 * table['Salary_SD'] / np.sqrt(count)
+    return table
@@ -0,0 +1,312 @@
+"""Exact and near-duplicate postings.
+
+Exact duplicates are found from a 64-bit fingerprint of the ``DEDUP_COLUMNS``
+of each row. Each description is hashed once, and rows are then compared as
+integers in a hash table, which keeps the first occurrence like
+``drop_duplicates``.
+
+Near duplicates, such as a repost with a few words changed, are found with
+MinHash and LSH. The title, location and description of a posting are cut
+into word shingles. ``num_perm`` min-hashes of the shingle hashes form its
+signature. Two postings agree on a min-hash with probability equal to the
+Jaccard similarity of their shingle sets. The signature is cut into bands of
+``rows`` min-hashes, and each band is hashed to a bucket key. A posting is
+compared with the first posting of each of its band buckets. It is linked to
+that posting when their signatures agree on at least ``threshold`` of the
+min-hashes. The linked postings form clusters, and only the first posting of
+each cluster is kept.
+Hashing, bucketing and the connected components are all linear in the
+number of postings. The signatures are computed a block of postings at a
+time. The bands of a block go straight into a hash table of bucket keys per
+band, then the block's signatures are dropped. Only the signatures of the
+postings heading a bucket are kept, to compare the later members with. A
+posting whose bands all land in earlier buckets keeps no signature. A
+posting that heads a bucket keeps its 4 bytes per min-hash, and each table
+slot takes 16 bytes, with at least twice as many slots as buckets.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from . import instrument
+
+#Columns used to drop repeated postings
+DEDUP_COLUMNS = ['Job_Description', 'job_title', 'Location']
+
+#Min-hashes per signature, words per shingle and postings hashed at a time
+NUM_PERM = 128
+SHINGLE = 3
+BLOCK = 2000
+
+#Signatures of bucket heads per chunk of the stored representatives
+REPRESENTATIVE_CHUNK = 2 ** 16
+
+#Odd 64-bit constants of splitmix64, used to mix word hashes into shingle hashes and band keys
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_MUL1 = np.uint64(0xBF58476D1CE4E5B9)
+_MUL2 = np.uint64(0x94D049BB133111EB)
+
+
+def _avalanche(h):
+    h = h ^ (h >> np.uint64(30))
+    h = h * _MUL1
+    h = h ^ (h >> np.uint64(27))
+    h = h * _MUL2
+    return h ^ (h >> np.uint64(31))
+
+
+def fingerprints(jobs, columns=DEDUP_COLUMNS):
+    """64-bit fingerprint of ``columns`` of every row, equal for equal rows (missing values included)."""
+    return pd.util.hash_pandas_object(jobs[list(columns)], index=False).to_numpy()
+
+
+def _texts(jobs):
+    parts = [jobs[col].astype(object).fillna('').astype(str) for col in ['job_title', 'Location', 'Job_Description']]
+    return (parts[0] + ' ' + parts[1] + ' ' + parts[2]).str.lower().str.findall(r'\w+')
+
+
+def _shingle_hashes(words, shingle):
+    """Hashes of the ``shingle``-word shingles of each posting and the offset of each posting's first one."""
+    lengths = np.array([len(w) for w in words], dtype=np.int64)
+    flat = np.array(list(itertools.chain.from_iterable(words)), dtype=object)
+    hashes = pd.util.hash_array(flat) if len(flat) else np.zeros(0, dtype=np.uint64)
+
+    #a posting of fewer words than a shingle has one shingle of its words, an empty one the empty shingle
+    counts = np.maximum(lengths - shingle + 1, 1)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    ends = starts + lengths
+    posting = np.repeat(np.arange(len(lengths)), counts)
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    position = starts[posting] + np.arange(counts.sum()) - offsets[posting]
+
+    padded = np.append(hashes, np.uint64(0))
+    mixed = np.zeros(len(position), dtype=np.uint64)
+    for k in range(shingle):
+        index = position + k
+        #words past the end of the posting count as the empty word
+        index = np.where(index < ends[posting], index, len(hashes))
+        mixed = (mixed * _MIX) + padded[index]
+    return _avalanche(mixed), offsets
+
+
+def minhash_blocks(jobs, num_perm=NUM_PERM, shingle=SHINGLE, seed=1, block=BLOCK):
+    """``(postings, num_perm)`` uint32 MinHash signatures of the title, location and description shingles,
+    one block of consecutive postings at a time."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, num_perm, dtype=np.uint64)
+
+    for start in range(0, len(jobs), block):
+        hashes, offsets = _shingle_hashes(_texts(jobs.iloc[start:start + block]).tolist(), shingle)
+        signatures = np.empty((len(offsets), num_perm), dtype=np.uint32)
+        for j in range(num_perm):
+            #one random hash function per min-hash, the high 32 bits of a*h+b
+            permuted = ((a[j] * hashes + b[j]) >> np.uint64(32)).astype(np.uint32)
+            signatures[:, j] = np.minimum.reduceat(permuted, offsets)
+        yield signatures
+
+
+def minhash_signatures(jobs, num_perm=NUM_PERM, shingle=SHINGLE, seed=1, block=BLOCK):
+    """``(postings, num_perm)`` uint32 MinHash signatures of all the postings at once."""
+    blocks = list(minhash_blocks(jobs, num_perm, shingle, seed, block))
+    return np.concatenate(blocks) if blocks else np.zeros((0, num_perm), dtype=np.uint32)
+
+
+def lsh_rows(threshold, num_perm=NUM_PERM):
+    """Min-hashes per band: the most whose band curve ``(1/bands)**(1/rows)`` still sits at or below ``threshold``.
+
+    A curve a little below the threshold misses few pairs; the false
+    candidates it lets through are removed by comparing the signatures.
+    """
+    best = 1
+    for rows in range(1, num_perm + 1):
+        if (1 / (num_perm // rows)) ** (1 / rows) <= threshold:
+            best = rows
+    return best
+
+
+def _band_keys(band):
+    key = np.zeros(len(band), dtype=np.uint64)
+    for col in range(band.shape[1]):
+        key = _avalanche((key * _MIX) ^ band[:, col].astype(np.uint64))
+    return key
+
+
+class _BucketTable:
+    """Open addressing hash table from uint64 bucket keys to non-negative ids, probed for many keys at once."""
+
+    def __init__(self, capacity=1024):
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.values = np.full(capacity, -1, dtype=np.int64)
+        self.size = 0
+
+    def _slots(self, keys):
+        #the band keys are avalanched, their low bits are already uniform
+        return (keys & np.uint64(len(self.keys) - 1)).astype(np.int64)
+
+    def get(self, keys):
+        """Id of each of ``keys``, -1 for a key not in the table."""
+        found = np.full(len(keys), -1, dtype=np.int64)
+        mask = len(self.keys) - 1
+        pending, slots = np.arange(len(keys)), self._slots(keys)
+        while len(pending):
+            values = self.values[slots]
+            hit = (values >= 0) & (self.keys[slots] == keys[pending])
+            found[pending[hit]] = values[hit]
+            probe = (values >= 0) & ~hit
+            pending, slots = pending[probe], (slots[probe] + 1) & mask
+        return found
+
+    def insert(self, keys, values):
+        """Add ``keys``, distinct and not in the table yet, with their ``values``."""
+        if 2 * (self.size + len(keys)) > len(self.keys):
+            used = self.values >= 0
+            old_keys, old_values = self.keys[used], self.values[used]
+            capacity = len(self.keys)
+            while 2 * (self.size + len(keys)) > capacity:
+                capacity *= 2
+            self.__init__(capacity)
+            self.insert(old_keys, old_values)
+        mask = len(self.keys) - 1
+        pending, slots = np.arange(len(keys)), self._slots(keys)
+        while len(pending):
+            #of the keys probing the same free slot the first takes it, the others probe on
+            take = np.zeros(len(pending), dtype=bool)
+            take[np.unique(slots, return_index=True)[1]] = True
+            take &= self.values[slots] < 0
+            self.keys[slots[take]] = keys[pending[take]]
+            self.values[slots[take]] = values[pending[take]]
+            pending, slots = pending[~take], (slots[~take] + 1) & mask
+        self.size += len(keys)
+
+
+class _Representatives:
+    """Signatures and positions of the postings heading a bucket, stored in chunks so growing copies nothing."""
+
+    def __init__(self, num_perm, chunk=REPRESENTATIVE_CHUNK):
+        self.num_perm = num_perm
+        self.chunk = chunk
+        self.signatures, self.positions = [], []
+        self.size = 0
+
+    def add(self, signatures, positions):
+        """Ids of the added postings."""
+        ids = np.arange(self.size, self.size + len(positions))
+        done = 0
+        while done < len(positions):
+            offset = self.size % self.chunk
+            if offset == 0:
+                self.signatures.append(np.empty((self.chunk, self.num_perm), dtype=np.uint32))
+                self.positions.append(np.empty(self.chunk, dtype=np.int64))
+            take = min(self.chunk - offset, len(positions) - done)
+            self.signatures[-1][offset:offset + take] = signatures[done:done + take]
+            self.positions[-1][offset:offset + take] = positions[done:done + take]
+            done += take
+            self.size += take
+        return ids
+
+    def get(self, ids):
+        """Signatures and positions of the postings ``ids``."""
+        signatures = np.empty((len(ids), self.num_perm), dtype=np.uint32)
+        positions = np.empty(len(ids), dtype=np.int64)
+        chunks = ids // self.chunk
+        for chunk in np.unique(chunks):
+            at = chunks == chunk
+            signatures[at] = self.signatures[chunk][ids[at] % self.chunk]
+            positions[at] = self.positions[chunk][ids[at] % self.chunk]
+        return signatures, positions
+
+
+def near_duplicate_clusters(blocks, threshold, rows=None):
+    """Cluster label of every posting, the position of the first posting of its cluster.
+
+    ``blocks`` are the signatures of consecutive postings, e.g.
+    ``minhash_blocks(jobs)`` or ``[minhash_signatures(jobs)]``.
+    """
+    from scipy import sparse
+    from scipy.sparse.csgraph import connected_components
+
+    n = 0
+    tables = None
+    sources, targets = [], []
+    for signatures in blocks:
+        if tables is None:
+            num_perm = signatures.shape[1]
+            rows = rows or lsh_rows(threshold, num_perm)
+            bands = range(0, num_perm - rows + 1, rows)
+            tables = [_BucketTable() for _ in bands]
+            representatives = _Representatives(num_perm)
+        positions = n + np.arange(len(signatures))
+
+        new_buckets = []
+        for table, start in zip(tables, bands):
+            keys = _band_keys(signatures[:, start:start + rows])
+            heads = table.get(keys)
+            #a member of an earlier block's bucket is compared with the head kept for it
+            known = np.flatnonzero(heads >= 0)
+            head_signatures, head_positions = representatives.get(heads[known])
+            similar = (signatures[known] == head_signatures).mean(axis=1) >= threshold
+            sources.append(positions[known[similar]])
+            targets.append(head_positions[similar])
+
+            #the first posting of each new bucket heads it, the other members of the block are compared with it
+            new = np.flatnonzero(heads < 0)
+            codes, uniques = pd.factorize(keys[new])
+            first = np.full(len(uniques), len(signatures), dtype=np.int64)
+            np.minimum.at(first, codes, new)
+            members = first[codes] != new
+            candidates, leads = new[members], first[codes[members]]
+            similar = (signatures[candidates] == signatures[leads]).mean(axis=1) >= threshold
+            sources.append(positions[candidates[similar]])
+            targets.append(positions[leads[similar]])
+            new_buckets.append((table, uniques, first))
+
+        #only the heads of the new buckets keep their signatures past this block
+        leaders = np.unique(np.concatenate([first for _, _, first in new_buckets]))
+        ids = np.zeros(len(signatures), dtype=np.int64)
+        ids[leaders] = representatives.add(signatures[leaders], positions[leaders])
+        for table, uniques, first in new_buckets:
+            table.insert(uniques, ids[first])
+        n += len(signatures)
+
+    sources = np.concatenate(sources) if sources else np.zeros(0, dtype=np.int64)
+    targets = np.concatenate(targets) if targets else np.zeros(0, dtype=np.int64)
+    graph = sparse.coo_matrix((np.ones(len(sources), dtype=np.int8), (sources, targets)), shape=(n, n))
+    _, components = connected_components(graph, directed=False)
+    first = np.full(components.max() + 1 if n else 0, n, dtype=np.int64)
+    np.minimum.at(first, components, np.arange(n))
+    return first[components]
+
+
+def _size_counts(sizes):
+    #{cluster size: number of clusters} for the clusters of more than one posting
+    sizes = pd.Series(sizes)
+    return {int(size): int(count) for size, count in sizes[sizes > 1].value_counts().sort_index().items()}
+
+
+def drop_duplicates(jobs, threshold=None, num_perm=NUM_PERM, report=None):
+    """Drop the repeated postings of ``jobs``, keeping the first of each.
+
+    Exact repeats of ``DEDUP_COLUMNS`` always go. With a Jaccard
+    ``threshold`` (e.g. 0.9) the near duplicates go too. The numbers
+    removed and the ``{size: clusters}`` counts of the duplicate groups go
+    to the ``report`` dict when one is given, and to the stage event.
+    """
+    prints = pd.Series(fingerprints(jobs))
+    repeated = prints.duplicated().to_numpy()
+    summary = {'exact': int(repeated.sum()), 'exact_groups': _size_counts(prints.value_counts().to_numpy())}
+    jobs = jobs[~repeated]
+    instrument.count('duplicates', summary['exact'])
+
+    if threshold is not None:
+        clusters = near_duplicate_clusters(minhash_blocks(jobs, num_perm), threshold)
+        kept = clusters == np.arange(len(jobs))
+        summary.update(near=int((~kept).sum()), near_clusters=_size_counts(np.bincount(clusters)))
+        jobs = jobs[kept]
+        instrument.count('near_duplicates', summary['near'])
+
+    instrument.annotate(**{key: value for key, value in summary.items() if key.endswith(('groups', 'clusters'))})
+    if report is not None:
+        report.update(summary)
+    return jobs
@@ -0,0 +1,407 @@
+"""Exploratory analysis of the cleaned postings and the report figures.
+
+matplotlib, seaborn, scipy and scikit-learn are imported inside
+the functions that use them, so importing this module stays cheap.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from . import itemsets, stats
+from .cube import build_cube, salary_table
+from .regions import RegionIndex, region_table
+from .titles import normalize_job_titles
+
+SIZE_ORDER = ['1 to 50 employees', '51 to 200 employees', '201 to 500 employees', '501 to 1000 employees',
+              '1001 to 5000 employees', '5001 to 10000 employees', '10000+ employees']
+
+REVENUE_USD_ORDER = ['<1 million', '1-5 million', '5-10 million', '10-25 million', '25-50 million',
+                     '50-100 million', '100-500 million', '0.5-1 billion', '1-2 billion', '2-5 billion',
+                     '5-10 billion', '10+ billion', 'Unknown']
+
+ANOVA_COLUMNS = ['Sector', 'Industry', 'State', 'HQState', 'Company_Name', 'Job_Domain', 'Revenue']
+
+REGION = ['VA', 'DC', 'MD']
+
+
+def _pyplot():
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
+
+
+# Skills
+
+def frequent_skill_itemsets(skills, min_support=0.1):
+    """Frequent itemsets of the ``refined_skills`` lists with their ``length``."""
+    return itemsets.frequent_itemsets(skills, min_support)
+
+
+def skill_rules(frequent_itemsets, metric='lift', min_threshold=1.0):
+    """Association rules between the frequent skill itemsets."""
+    return itemsets.association_rules(frequent_itemsets, metric, min_threshold)
+
+
+def plot_skills(frequent_itemsets):
+    #Plot for main demanded skills in data science jobs
+    plt, sns = _pyplot()
+    single = frequent_itemsets[frequent_itemsets['length'] == 1].copy()
+    single['itemsets'] = single['itemsets'].astype("unicode").str.replace(r'[\(\)\'\{\}]|frozenset', '', regex=True)
+    fig, ax = plt.subplots()
+    sns.barplot(x="itemsets", y="support", data=single, palette='Accent', ax=ax)
+    ax.set_xticklabels(ax.get_xticklabels(), rotation=90)
+    ax.set(ylabel="Frequency", xlabel="Skills", title=' Main requested skills in data analysis')
+    return fig
+
+
+# Salaries
+
+def salary_means(jobs):
+    """Mean of the minimum, maximum and average salary."""
+    return jobs[['Min_Salary', 'Max_Salary', 'Est_Salary']].mean()
+
+
+def plot_salary_distribution(jobs):
+    #Distribution plot for Min, max and avg salary distribution for data scientists
+    plt, sns = _pyplot()
+    fig = plt.figure(figsize=(13, 5))
+    sns.set(style='white')
+    sns.distplot(jobs['Min_Salary'], color="r")
+    sns.distplot(jobs['Max_Salary'], color="g")
+    sns.distplot(jobs['Est_Salary'], color="b")
+
+    plt.xlabel("Salary ($'000)")
+    plt.legend(['Min_Salary', 'Max_Salary', 'Est_Salary'])
+    plt.title("Distribution of Min, Max and Avg Salary", fontsize=19)
+    plt.xlim(0, 210)
+    plt.xticks(np.arange(0, 210, step=10))
+    plt.tight_layout()
+    return fig
+
+
+def salary_cube(jobs):
+    """Openings, companies and salary sums of every report grouping, see ``build_cube``."""
+    return build_cube(jobs)
+
+
+def top_openings(cube, column, n=20):
+    """The ``n`` values of ``column`` with the most job openings, in a ``Jobs`` column."""
+    return cube[(column,)]['Jobs'].reset_index().sort_values('Jobs', ascending=False).head(n)
+
+
+def openings_with_salaries(cube, column, top=None, states=None):
+    """``Jobs`` and mean ``Est_Salary`` with its 95% ``Salary_CI`` of the top ``column`` values, for the plots.
+
+    ``top`` defaults to ``top_openings(cube, column)``. With ``states`` the
+    salaries are those of the postings in these states.
+    """
+    if top is None:
+        top = top_openings(cube, column)
+    table = salary_table(cube, [column]) if states is None else region_table(cube, [column], states)
+    salaries = table[[column, 'Est_Salary', 'Salary_CI']]
+    return top.merge(salaries, on=column, how='left')
+
+
+def _salary_intervals(ax, sal_by):
+    #the 95% intervals of the mean salaries, drawn over the bars or points at 0..n-1
+    ax.errorbar(sal_by['Est_Salary'], np.arange(len(sal_by)), xerr=sal_by['Salary_CI'], fmt='none', ecolor='0.26')
+
+
+def plot_openings_and_salary(sal_by, column, title, style='white', ylabel=""):
+    #Job openings next to the mean salary for each value of column
+    plt, sns = _pyplot()
+    sns.set(style=style)
+    fig, (ax_bar, ax_point) = plt.subplots(ncols=2, sharey=True, gridspec_kw={"width_ratios": (0.6, 1)}, figsize=(13, 7))
+    sns.barplot(x='Jobs', y=column, data=sal_by, ax=ax_bar, palette='Accent').set(ylabel=ylabel)
+    sns.pointplot(x='Est_Salary', y=column, data=sal_by, join=False, ax=ax_point, palette='Accent').set(
+        ylabel="", xlabel="Salary ($'000)")
+    _salary_intervals(ax_point, sal_by)
+    plt.subplots_adjust(top=0.9)
+    plt.suptitle(title, fontsize=16)
+    plt.tight_layout()
+    return fig
+
+
+def plot_salary_by_state(jobs):
+    #Barplot for estimated salary by state
+    plt, sns = _pyplot()
+    fig, ax = plt.subplots(figsize=(14, 6))
+    sns.barplot(x='State_Location', y='Est_Salary', data=jobs, palette="Accent", ax=ax)
+    ax.set(xlabel='States', ylabel="Salary($'000)")
+    ax.tick_params(axis='x', rotation=90)
+    return fig
+
+
+def plot_salary_bars(sal_by, column, title):
+    #Barplot for estimated salary by the top values of column
+    plt, sns = _pyplot()
+    fig, ax = plt.subplots(figsize=(6, 6))
+    sns.barplot(x='Est_Salary', y=column, data=sal_by, palette="Accent", ax=ax).set(title=title, xlabel="Salary ($'000)")
+    _salary_intervals(ax, sal_by)
+    return fig
+
+
+# Revenue and companies
+
+def revenue_openings(cube):
+    """Job openings and salaries per revenue bucket with the short ``Revenue_USD`` label, most openings first."""
+    return salary_table(cube, ['Revenue', 'Revenue_USD']).sort_values(
+        'Jobs', ascending=False).reset_index(drop=True)
+
+
+def plot_revenue_salary(jobs):
+    #Lineplot for Revenue vs Salary
+    plt, sns = _pyplot()
+    fig, ax = plt.subplots(figsize=(6, 6))
+    sns.lineplot(x="Revenue", y="Est_Salary", data=jobs, sort=False, ax=ax)
+    ax.tick_params(axis='x', rotation=90)
+    return fig
+
+
+def plot_revenue_openings(cube):
+    #Job openings and Salary Estimate by Revenue
+    return plot_openings_and_salary(revenue_openings(cube), 'Revenue_USD', 'Jobs and Salary by Revenue',
+                                    style='whitegrid', ylabel='Revenue in USD')
+
+
+def plot_company_age(jobs):
+    #Companies age
+    plt, sns = _pyplot()
+    fig = plt.figure(figsize=(13, 5))
+    sns.set(style='white')
+    sns.distplot(jobs['Years_Founded'], color="b")
+    plt.axvline(x=jobs.Years_Founded.mean(), color='k', linestyle='--')
+    plt.xlabel("Yrs founded")
+    plt.title("Companies ages", fontsize=19)
+    plt.xlim(0, 210)
+    plt.xticks(np.arange(0, 150, step=10))
+    plt.tight_layout()
+    return fig
+
+
+def plot_revenue_by_ownership(jobs):
+    #Boxplot for revenue and type of ownership
+    plt, sns = _pyplot()
+    fig, ax = plt.subplots()
+    sns.boxplot(x=jobs["MaxRevenue"], y=jobs['Type_ownership'], ax=ax).set(
+        ylabel='Ownership Type', xlabel="Max Revenue in billionsof USD")
+    ax.set_title("Max revenue per ownership type")
+    return fig
+
+
+def firm_size_table(cube, values='Companies', states=None):
+    """Revenue by company size table of distinct companies by default (or ``Est_Salary``), for the heatmaps.
+
+    With ``states`` only the postings in these states are counted.
+    """
+    grouping = ['Revenue_USD', 'Size']
+    table = salary_table(cube, grouping) if states is None else region_table(cube, grouping, states)
+    table = table.pivot(index='Revenue_USD', columns='Size', values=values)
+    return table.reindex(index=REVENUE_USD_ORDER, columns=SIZE_ORDER).replace(np.nan, 0)
+
+
+# Regional deep dive
+
+def region_index(jobs):
+    """Postings laid out by state for the regional drill-downs, see ``RegionIndex``."""
+    return RegionIndex(jobs)
+
+
+def region(index, states=REGION):
+    """Postings in the given states, from a ``region_index``."""
+    return index.rows(states)
+
+
+def region_comparison(cube, column, states=REGION):
+    """Openings and mean salary of every ``column`` value, nationally and in ``states`` side by side.
+
+    The cube needs a ``('State', column, 'Company_Name')`` grouping.
+    """
+    measures = ['Jobs', 'Companies', 'Est_Salary']
+    national = salary_table(cube, [column])[[column] + measures]
+    regional = region_table(cube, [column], states)[[column] + measures]
+    return national.merge(regional, on=column, how='left', suffixes=('_national', '_region'))
+
+
+def plot_region_salary(index, states=REGION, label='VA,DC,MD'):
+    #Comparing avg salary distribution for data science jobs in national and regional level.
+    plt, sns = _pyplot()
+    fig = plt.figure(figsize=(13, 5))
+    sns.set(style='white')
+    sns.distplot(index.values('Est_Salary', states), color="r")
+    sns.distplot(index.jobs['Est_Salary'], color="g")
+
+    plt.xlabel("Salary ($'000)")
+    plt.legend(['Est_Salary ' + label, 'Est_Salary_all'])
+    plt.title("Distribution of Avg Salary in {} and national level".format(label), fontsize=19)
+    plt.xlim(0, 210)
+    plt.xticks(np.arange(0, 210, step=10))
+    plt.tight_layout()
+    return fig
+
+
+def plot_firm_size_heatmaps(cube, states=REGION, label='VA,DC,MD'):
+    #Comparison heatmaps for number of companies offering jobs and salaries in terms of revenue and size
+    plt, sns = _pyplot()
+    fig, axs = plt.subplots(nrows=2, ncols=2, sharey=True, sharex=True, figsize=(13, 9))
+    heatmap = dict(annot=True, fmt='.0f', annot_kws={"size": 12})
+    sns.heatmap(firm_size_table(cube), cmap="YlGnBu", ax=axs[0, 0], **heatmap).set(
+        title="Number of Firms offering jobs for Data Scientist roles (US)", xlabel="", ylabel="Revenue USD")
+    sns.heatmap(firm_size_table(cube, states=states), cmap="YlGnBu", ax=axs[0, 1], **heatmap).set(
+        title="Number of Firms offering jobs for Data Scientist roles({})".format(label), xlabel="", ylabel="")
+    sns.heatmap(firm_size_table(cube, 'Est_Salary'), cmap="Greens", ax=axs[1, 0], **heatmap).set(
+        title="Avg. Salaries of Data Scientist roles (US)", ylabel="Revenue USD")
+    sns.heatmap(firm_size_table(cube, 'Est_Salary', states), cmap="Greens", ax=axs[1, 1], **heatmap).set(
+        title="Avg. Salaries of Data Scientist roles ({})".format(label), ylabel="")
+    plt.setp([a.get_xticklabels() for a in axs[1, :]], rotation=45, ha='right')
+    plt.tight_layout()
+    return fig
+
+
+# Statistical tests
+
+def anova(jobs, columns=ANOVA_COLUMNS, target='Est_Salary'):
+    """One-way ANOVA p-value of ``target`` across the groups of each column."""
+    return stats.anova_table(stats.anova_stats(jobs, columns, target))['P-value']
+
+
+JOBS_LM_COLUMNS = ['job_title', 'Est_Salary', 'Max_Salary', 'Min_Salary', 'State', 'City', 'MaxRevenue', 'Rating',
+                   'MaxEmpSize', 'Industry', 'Sector', 'Type_ownership', 'Years_Founded', 'Company_Name', 'HQState']
+
+
+def title_frame(jobs):
+    """Job title analysis frame (``jobs_lm``) with the normalized ``job_title2``."""
+    jobs_lm = jobs[JOBS_LM_COLUMNS].copy()
+    jobs_lm['job_title2'] = normalize_job_titles(jobs_lm['job_title'])
+    return jobs_lm
+
+
+def title_salaries(jobs_lm, n=20):
+    """Mean salaries and spread of the ``n`` most frequent normalized titles."""
+    job_count = jobs_lm.groupby('job_title2')[['job_title']].count().reset_index().rename(
+        columns={'job_title': 'Count'})
+    job_salary = jobs_lm.groupby('job_title2')[['Max_Salary', 'Est_Salary', 'Min_Salary']].mean()
+    job_salary['Spread'] = job_salary['Max_Salary'] - job_salary['Est_Salary']
+    return job_salary.merge(job_count, on='job_title2', how='left').sort_values('Count', ascending=False).head(n)
+
+
+def top_title_words(jobs_lm, min_count=1000):
+    """Words of the normalized titles used more than ``min_count`` times."""
+    counts = jobs_lm['job_title2'].str.split(expand=True).stack().value_counts()
+    counts = counts.rename_axis('TW').reset_index(name='Count')
+    return counts[counts['Count'] > min_count]
+
+
+def title_word_dummies(jobs_lm, words):
+    """Add a 0/1 column per top word; titles without any top word are dropped."""
+    words = set(words)
+    keywords = jobs_lm['job_title2'].apply(lambda x: [word for word in x.split(" ") if word in words])
+    twdummy = pd.get_dummies(keywords.apply(pd.Series).stack()).groupby(level=0).sum().replace(2, 1)
+    return jobs_lm.merge(twdummy, left_index=True, right_index=True).replace(np.nan, 0)
+
+
+def title_ttests(jobs_lm, words):
+    """t-test of ``Est_Salary`` between titles with and without each top word, by p-value."""
+    words = [word for word in words if word in jobs_lm]
+    ttests = stats.batch_ttests(jobs_lm[words].to_numpy(dtype=np.float64), jobs_lm['Est_Salary'], words)
+    return ttests.reset_index().sort_values('P-value', ascending=True)
+
+
+# Feature importance
+
+def feature_importance(jobs, columns=('Rating', 'Sector', 'MaxEmpSize', 'State_Location', 'MaxRevenue', 'Years_Founded')):
+    """Coefficients of a logistic regression of the (int) salary on standardized features.
+
+    Expects the State_Location, Sector and Type_ownership codes from
+    ``features.encode_codes``.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.preprocessing import StandardScaler
+
+    X = jobs[list(columns)]
+    y = jobs['Est_Salary']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    ss = StandardScaler()
+    X_train_scaled = ss.fit_transform(X_train)
+
+    model = LogisticRegression()
+    model.fit(X_train_scaled, y_train)
+    importances = pd.DataFrame(data={'Attribute': X_train.columns, 'Importance': model.coef_[0]})
+    return importances.sort_values(by='Importance', ascending=False)
+
+
+def plot_feature_importance(importances):
+    plt, _ = _pyplot()
+    fig, ax = plt.subplots()
+    ax.bar(x=importances['Attribute'], height=importances['Importance'], color='#087E8B')
+    ax.set_title('Feature importances obtained from coefficients', size=20)
+    ax.tick_params(axis='x', rotation=90)
+    return fig
+
+
+# Report
+
+def report(jobs, out_dir='reports'):
+    """Write the report figures and tables for the cleaned, imputed postings to ``out_dir``."""
+    import matplotlib
+    matplotlib.use('Agg')
+    plt, _ = _pyplot()
+
+    from .features import encode_codes, to_int
+
+    os.makedirs(out_dir, exist_ok=True)
+
+    def save(fig, name):
+        fig.savefig(os.path.join(out_dir, name + '.png'), dpi=300)
+        plt.close(fig)
+
+    def write(table, name):
+        table.to_csv(os.path.join(out_dir, name + '.csv'))
+
+    write(salary_means(jobs), 'salary_means')
+    save(plot_salary_distribution(jobs), 'min_max_sal')
+
+    #the openings, companies and salaries of every grouping below, in one pass over the postings
+    cube = salary_cube(jobs)
+    sal_by = {}
+    for column, name in (('Company_Name', 'Companies'), ('Industry', 'industry'), ('Sector', 'sector'),
+                         ('Location', 'City'), ('State_Location', 'State')):
+        sal_by[column] = openings_with_salaries(cube, column)
+        save(plot_openings_and_salary(sal_by[column], column, 'Jobs and salary by ' + name), 'jobs_salary_by_' + column)
+
+    save(plot_salary_by_state(jobs), 'salary_by_state')
+    save(plot_revenue_salary(jobs), 'revenue_salary')
+    save(plot_revenue_openings(cube), 'jobs_salary_by_revenue')
+    save(plot_salary_bars(sal_by['Industry'], 'Industry', 'Salary Estimate by Industry'), 'salary_by_industry')
+    save(plot_salary_bars(sal_by['Sector'], 'Sector', 'Salary Estimate by Sector'), 'salary_by_sector')
+    save(plot_company_age(jobs), 'company_age')
+    save(plot_revenue_by_ownership(jobs), 'revenue_by_ownership')
+
+    frequent_itemsets = frequent_skill_itemsets(jobs['refined_skills'])
+    write(frequent_itemsets, 'frequent_skill_itemsets')
+    write(skill_rules(frequent_itemsets), 'skill_rules')
+    save(plot_skills(frequent_itemsets), 'skills')
+
+    index = region_index(jobs)
+    save(plot_region_salary(index), 'avg_sal')
+    save(plot_firm_size_heatmaps(cube), 'firm_size_heatmaps')
+    #regional salaries for the national top 20 companies
+    top_firms = top_openings(cube, 'Company_Name')
+    save(plot_openings_and_salary(openings_with_salaries(cube, 'Company_Name', top_firms, REGION), 'Company_Name',
+                                  'Jobs and salary by companies in VA,DC,MD'), 'jobs_salary_by_company_VA_DC_MD')
+
+    write(anova(jobs), 'anova')
+
+    jobs = to_int(jobs)
+    jobs_lm = title_frame(jobs)
+    write(title_salaries(jobs_lm), 'title_salaries')
+    words = top_title_words(jobs_lm)['TW']
+    jobs_lm = title_word_dummies(jobs_lm, words)
+    jobs_lm.to_csv(os.path.join(out_dir, 'jobs_lm.csv'))
+    write(title_ttests(jobs_lm, words), 'title_ttests')
+
+    importances = feature_importance(encode_codes(jobs))
+    write(importances, 'feature_importance')
+    save(plot_feature_importance(importances), 'feature_importance')
@@ -0,0 +1,408 @@
+"""Feature extraction from the cleaned job descriptions.
+
+The skill dictionary is compiled once into a term index so each description
+is scanned a single time, whatever the size of the dictionary.
+"""
+import operator
+import re
+
+import numpy as np
+import pandas as pd
+
+#Skill categories and the terms searched for in the job descriptions
+SKILL_TYPES = {}
+
+SKILL_TYPES['Statistics'] = ['matlab',
+ 'statistical',
+ 'models',
+ 'modeling',
+ 'statistics',
+ 'analytics',
+ 'forecasting',
+ 'predictive',
+ 'r',
+ 'R', 
+ 'pandas',
+ 'statistics',
+ 'statistical',
+ 'Julia']
+
+SKILL_TYPES['Machine Learning'] = ['datarobot',
+ 'tensorflow',
+ 'knime',
+ 'rapidminer',
+ 'mahout',
+ 'logicalglue',
+ 'nltk',
+ 'networkx',
+ 'rapidminer',
+ 'scikit',
+ 'pytorch',
+ 'keras',
+ 'caffe',
+ 'weka',
+ 'orange',
+ 'qubole',
+ 'ai',
+ 'nlp',
+ 'ml',
+ 'neuralnetworks',
+ 'deeplearning']
+
+SKILL_TYPES['Data Visualization'] = ['tableau',
+ 'powerpoint',
+ 'Qlik',
+ 'looker',
+ 'powerbi',
+ 'matplotlib',
+ 'tibco',
+ 'bokeh',
+ 'd3',
+ 'octave',
+ 'shiny',
+ 'microstrategy']
+
+SKILL_TYPES['Data Engineering'] = ['etl',
+ 'mining',
+ 'warehousing',
+ 'cloud',
+ 'sap',
+ 'salesforce',
+ 'openrefine',
+ 'redis',
+ 'sybase',
+ 'cassandra',
+ 'msaccess',
+ 'databasemanagement',
+ 'aws',
+ 'ibmcloud',
+ 'azure',
+ 'redshift',
+ 's3',
+ 'ec2',
+ 'rds',
+ 'bigquery',
+ 'googlecloudplatform',
+ 'googlecloudplatform',
+ 'hadoop',
+ 'hive',
+ 'kafka',
+ 'hbase',
+ 'mesos',
+ 'pig',
+ 'storm',
+ 'scala',
+ 'hdfs',
+ 'mapreduce',
+ 'kinesis',
+ 'flink']
+
+SKILL_TYPES['Software Engineer'] = ['java',
+ 'javascript',
+ 'c#',
+ 'c',
+ 'docker',
+ 'ansible',
+ 'jenkins',
+ 'nodejs',
+ 'angularjs',
+ 'css',
+ 'html',
+ 'terraform',
+ 'kubernetes',
+ 'lex',
+ 'perl',
+ 'cplusplus',
+ 'Python',
+ 'python']
+
+SKILL_TYPES['SQL'] = ['sql',
+ 'oracle',
+ 'mysql',
+ 'oraclenosql',
+ 'nosql',
+ 'postgresql',
+ 'plsql',
+ 'mongodb']
+
+SKILL_TYPES['Trait Skills'] = ['Learning',
+ 'TimeManagement',
+ 'AttentiontoDetail',
+ 'ProblemSolving',
+ 'criticalthinking']
+
+SKILL_TYPES['Social Skills']= ['teamwork',
+ 'team'
+ 'communication',
+ 'written',
+ 'verbal',
+ 'writing',
+ 'leadership',
+ 'interpersonal',
+ 'personalmotivation',
+ 'storytelling']
+
+SKILL_TYPES['Business'] = ['excel',
+ 'bi',
+ 'reporting',
+ 'reports',
+ 'dashboards',
+ 'dashboard',
+ 'businessintelligence'
+ 'business']
+
+SKILL_TYPES = {k: [skill.lower() for skill in v] for k, v in SKILL_TYPES.items()}
+
+#Column name -> keyword searched for in the job description
+SKILL_KEYWORDS = {'python': 'python',
+                  'spark': 'spark',
+                  'aws': 'aws',
+                  'excel': 'excel',
+                  'sql': 'sql',
+                  'sas': 'sas',
+                  'hadoop': 'hadoop',
+                  'tableau': 'tableau',
+                  'bi': 'power bi'}
+
+
+def build_skill_index(skill_types):
+    """Compile ``{category: [terms]}`` into a ``{term: (category, ...)}`` index.
+
+    Two-word skills are written attached in the dictionary, e.g.
+    'businessintelligence', and are looked up the same way as single words.
+    """
+    index = {}
+    for category, terms in skill_types.items():
+        for term in terms:
+            categories = index.setdefault(term, [])
+            if category not in categories:
+                categories.append(category)
+    return {term: tuple(categories) for term, categories in index.items()}
+
+
+def _categories(index):
+    #Skill categories in dictionary order
+    return list(dict.fromkeys(c for categories in index.values() for c in categories))
+
+
+def _match_skills(desc, index, terms):
+    #Every word plus every pair of adjacent words attached together
+    words = desc.split()
+    tokens = set(words)
+    tokens.update(map(operator.add, words, words[1:]))
+
+    found = set()
+    for term in tokens & terms:
+        found.update(index[term])
+    return found
+
+
+def extract_skills(descriptions, index):
+    """Return the skill categories found in each description.
+
+    Gives the same categories as the original ``refiner()``, listed in
+    dictionary order, as a Series of lists indexed like ``descriptions``.
+    """
+    descriptions = pd.Series(descriptions)
+    terms = frozenset(index)
+    order = {category: i for i, category in enumerate(_categories(index))}
+    skills = [sorted(_match_skills(desc, index, terms), key=order.get) for desc in descriptions]
+    return pd.Series(skills, index=descriptions.index, name='refined_skills')
+
+
+def skill_matrix(descriptions, index):
+    """Return a sparse ``(postings, categories)`` 0/1 matrix and the category names.
+
+    The matrix is a ``scipy.sparse.csr_matrix`` of uint8, one column per
+    skill category in dictionary order.
+    """
+    from scipy import sparse
+
+    terms = frozenset(index)
+    categories = _categories(index)
+    column = {category: i for i, category in enumerate(categories)}
+
+    indices = []
+    indptr = [0]
+    for desc in descriptions:
+        indices.extend(sorted(column[c] for c in _match_skills(desc, index, terms)))
+        indptr.append(len(indices))
+
+    data = np.ones(len(indices), dtype=np.uint8)
+    matrix = sparse.csr_matrix((data, np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int64)),
+                               shape=(len(indptr) - 1, len(categories)))
+    return matrix, categories
+
+
+_WORD = re.compile(r'\w+')
+
+
+def keyword_flags(texts, keywords, whole_words=False, packed=False):
+    """Flag which ``keywords`` occur in each text, in a single pass over the texts.
+
+    Each text is lowercased once. By default a keyword matches anywhere in
+    the text, like ``'sql' in text.lower()``; with ``whole_words=True`` it
+    must match whole words, which is a hash lookup of the text's words and
+    word n-grams so the cost does not grow with the number of keywords.
+
+    Returns a ``(texts, keywords)`` uint8 matrix, or the ``np.packbits``
+    of it along the keyword axis when ``packed`` is true.
+    """
+    keywords = [keyword.lower() for keyword in keywords]
+    column = {}
+    patterns = []
+    for i, keyword in enumerate(keywords):
+        words = keyword.split()
+        if whole_words and ' '.join(words) == ' '.join(_WORD.findall(keyword)):
+            column.setdefault(' '.join(words), []).append(i)
+        elif whole_words:
+            #keywords like 'c++' have no word boundary at the end, search them directly
+            patterns.append((i, re.compile(r'(?<!\w)' + re.escape(keyword) + r'(?!\w)')))
+    ngram = max((key.count(' ') + 1 for key in column), default=0)
+    lookup = frozenset(column)
+
+    texts = list(texts)
+    flags = np.zeros((len(texts), len(keywords)), dtype=np.uint8)
+    for row, text in enumerate(texts):
+        text = text.lower()
+        if not whole_words:
+            flags[row] = [keyword in text for keyword in keywords]
+            continue
+        words = _WORD.findall(text)
+        grams = set(words)
+        for n in range(2, ngram + 1):
+            grams.update(map(' '.join, zip(*(words[k:] for k in range(n)))))
+        for key in grams & lookup:
+            flags[row, column[key]] = 1
+        for i, pattern in patterns:
+            if pattern.search(text):
+                flags[row, i] = 1
+
+    return np.packbits(flags, axis=1) if packed else flags
+
+
+#Integer codes of the notebook for the State_Location, Sector and Type_ownership columns,
+#the first entries of the vocabularies learned by fit_vocabularies
+STATE_CODES = {'NY': 0, 'NJ': 1, 'CA': 2, 'IL': 3, 'TX': 4,
+               'AZ': 5, 'PA': 6, 'DE': 7, 'FL': 8, 'IN': 9, 'OH': 10, 'NC': 11, 'SC': 12, 'UT': 13,
+               'VA': 14, 'WA': 15, 'GA': 16, 'KS': 17, 'CO': 18, 'DC': 19, 'MD': 20, 'MA': 21, 'TN': 22,
+               'MI': 23, 'OK': 24, 'OR': 25, 'NV': 26, 'KY': 27, 'WI': 28, 'NM': 29, 'MO': 30, 'NE': 31,
+               'MN': 32, 'LA': 33, 'AK': 34, 'VT': 35, 'MS': 36, 'CT': 37, 'PR': 38, 'HI': 39}
+
+SECTOR_CODES = {'Health Care': 0, 'Finance': 1, 'Biotech & Pharmaceuticals': 2,
+                'Manufacturing': 3, 'Information Technology': 4, 'Insurance': 5,
+                'Business Services': 6, 'Education': 7, 'Media': 8, 'Consumer Services': 9,
+                'Restaurants, Bars & Food Services': 10, 'Retail': 11, 'Accounting & Legal': 12,
+                'Non-Profit': 13, 'Oil, Gas, Energy & Utilities': 14, 'Agriculture & Forestry': 15,
+                'Transportation & Logistics': 16, 'Aerospace & Defense': 17, 'Travel & Tourism': 18,
+                'Construction, Repair & Maintenance': 19, 'Government': 20, 'Real Estate': 21,
+                'Telecommunications': 22, 'Arts, Entertainment & Recreation': 23, 'Mining & Metals': 24}
+
+OWNERSHIP_CODES = {'Nonprofit Organization': 0, 'Company - Private': 1, 'Company - Public': 2,
+                   'Subsidiary or Business Segment': 3, 'College / University': 4, 'Contract': 5,
+                   'Self-employed': 6, 'Unknown': 7, 'Hospital': 8, 'Government': 9,
+                   'Other Organization': 10, 'School / School District': 11, 'Franchise': 12,
+                   'Private Practice / Firm': 13}
+
+CODE_MAPS = {'State_Location': STATE_CODES, 'Sector': SECTOR_CODES, 'Type_ownership': OWNERSHIP_CODES}
+
+#Code of a missing label or a label not in the vocabulary, like pandas Categorical codes
+UNSEEN_CODE = -1
+
+#Float columns converted to int for ease of modelling
+INT_COLUMNS = ['Rating', 'Founded', 'MaxEmpSize', 'Est_Salary', 'Years_Founded', 'MaxRevenue']
+
+
+def title_simplifier(title):
+    title = title.lower()
+    if 'business analyst' in title:
+        return 'business analyst'
+    elif 'data scientist' in title:
+        return 'data scientist'
+    elif 'data engineer' in title:
+        return 'data engineer'
+    elif 'data analyst' in title:
+        return 'data analyst'
+    elif 'analyst' in title:
+        return 'analyst'
+    elif 'machine learning' in title:
+        return 'mle'
+    elif 'consultant' in title:
+        return 'consultant'
+    elif 'engineer' in title:
+        return 'engineer'
+    elif 'manager' in title or 'executive' in title or 'principal' in title:
+        return 'manager'
+    elif 'director' in title:
+        return 'director'
+    elif 'scientist' in title:
+        return 'Other Scientist'
+    else:
+        return 'other'
+
+
+def seniority(title):
+    title = title.lower()
+    if any(word in title for word in ('sr', 'senior', 'lead', 'principal', 'manager', 'executive', 'director')):
+        return 'senior'
+    elif 'junior' in title or 'jr' in title:
+        return 'jr'
+    else:
+        return 'na'
+
+
+def to_int(jobs):
+    """Truncate the ``INT_COLUMNS`` present in ``jobs`` to the smallest int type holding them."""
+    jobs = jobs.copy()
+    for col in INT_COLUMNS:
+        if col in jobs:
+            jobs[col] = pd.to_numeric(jobs[col].astype(np.int64), downcast='integer')
+    return jobs
+
+
+def fit_vocabularies(jobs, seed=CODE_MAPS):
+    """Labels of the coded columns on the training postings, a label's code is its position.
+
+    Each vocabulary starts with the ``seed`` labels in code order, so the
+    notebook codes do not change, followed by the other labels of ``jobs``
+    in order of appearance.
+    """
+    vocabularies = {}
+    for col, codes in seed.items():
+        labels = sorted(codes, key=codes.get)
+        labels += [label for label in pd.unique(jobs[col].dropna()) if label not in codes]
+        if len(labels) > np.iinfo(np.int16).max:
+            raise ValueError('{} has too many labels for int16 codes: {}'.format(col, len(labels)))
+        vocabularies[col] = labels
+    return vocabularies
+
+
+def encode_codes(jobs, vocabularies=None):
+    """Replace the State_Location, Sector and Type_ownership labels by their int16 codes.
+
+    ``vocabularies`` comes from ``fit_vocabularies`` on the training postings
+    (fitted on ``jobs`` when not given). The codes are a hash lookup through
+    a pandas Categorical. Missing labels and labels outside the vocabulary
+    get ``UNSEEN_CODE``.
+    """
+    if vocabularies is None:
+        vocabularies = fit_vocabularies(jobs)
+    jobs = jobs.copy()
+    for col, labels in vocabularies.items():
+        jobs[col] = pd.Categorical(jobs[col], categories=labels).codes.astype(np.int16)
+    return jobs
+
+
+def add_title_features(jobs):
+    """Add the simplified job title (``job_simp``) and ``seniority`` columns."""
+    jobs = jobs.copy()
+    #plain strings, a categorical job_title would map to categoricals
+    titles = jobs['job_title'].astype(object)
+    jobs['job_simp'] = titles.apply(title_simplifier)
+    jobs['seniority'] = titles.apply(seniority)
+    return jobs
+
+
+def model_features(jobs, vocabularies=None):
+    """Int columns, integer codes and title features used by the models."""
+    return add_title_features(encode_codes(to_int(jobs), vocabularies))
@@ -0,0 +1,212 @@
+"""Structured per-stage events: timings, memory and row counts.
+
+    instrument.configure('events.jsonl', deep=['skills'])
+    with instrument.stage('text', jobs) as event:
+        jobs = clean.clean_text(jobs)
+        event.output(jobs)
+
+Every stage writes one JSON line to the sink with its wall and CPU seconds,
+the RSS at the start and the peak RSS above it, the rows and columns in and
+out, and the rows each filter removed (``count``). Stages named in ``deep``
+also run under cProfile and tracemalloc. Until a sink is configured
+``stage`` hands back one shared no-op object, so instrumented code pays a
+function call per stage and nothing per row.
+"""
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+#Open JSON-lines sink, None when instrumentation is off
+_sink = None
+_sink_path = None
+_deep = frozenset()
+#Stages being recorded in this thread, innermost last
+_local = threading.local()
+
+#Number of profile and allocation entries kept in a deep event
+DEEP_TOP = 25
+
+
+class RssSampler:
+    """Peak resident set size of this process while the sampler runs, polled from /proc."""
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.start = self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+
+    @staticmethod
+    def current():
+        try:
+            with open('/proc/self/statm') as f:
+                return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+        except OSError:
+            #no /proc, fall back to the high-water mark of the whole process
+            import resource
+            scale = 1 if sys.platform == 'darwin' else 1024
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+    def _poll(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self.current())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.start = self.peak = self.current()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def configure(path=None, deep=()):
+    """Send events to the JSON-lines file ``path`` ('-' for stderr), or turn them off with None.
+
+    ``deep`` names the stages also run under cProfile and tracemalloc.
+    """
+    global _sink, _sink_path, _deep
+    if _sink is not None and _sink is not sys.stderr:
+        _sink.close()
+    _sink_path = path
+    _sink = None if path is None else sys.stderr if path == '-' else open(path, 'a', buffering=1)
+    _deep = frozenset(deep or ())
+
+
+def enabled():
+    return _sink is not None
+
+
+def settings():
+    """``(path, deep)`` of the current ``configure`` call, to configure worker processes the same way."""
+    return _sink_path, tuple(_deep)
+
+
+def emit(event):
+    """Write one event to the sink, when there is one."""
+    if _sink is not None:
+        _sink.write(json.dumps(event, default=str) + '\n')
+
+
+def _shape(obj):
+    #frames and arrays, or the sparse matrix X of a models.Design
+    shape = getattr(obj, 'shape', None) or getattr(getattr(obj, 'X', None), 'shape', None)
+    if shape is None:
+        return None, None
+    return int(shape[0]), int(shape[1]) if len(shape) > 1 else None
+
+
+def count(what, rows):
+    """Add ``rows`` to the ``removed[what]`` count of the innermost stage being recorded."""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        removed = stack[-1].event['removed']
+        removed[what] = removed.get(what, 0) + int(rows)
+
+
+def annotate(**fields):
+    """Add ``fields`` to the event of the innermost stage being recorded."""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1].event.update(fields)
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def output(self, value):
+        pass
+
+    def set(self, **fields):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+class _Stage:
+    def __init__(self, name, value_in, fields):
+        rows_in, cols_in = _shape(value_in)
+        self.event = dict({'event': 'stage', 'stage': name, 'pid': os.getpid(), 'rows_in': rows_in,
+                           'cols_in': cols_in, 'rows_out': None, 'cols_out': None, 'removed': {}}, **fields)
+        self.deep = name in _deep
+
+    def output(self, value):
+        self.event['rows_out'], self.event['cols_out'] = _shape(value)
+
+    def set(self, **fields):
+        self.event.update(fields)
+
+    def __enter__(self):
+        _local.stack = getattr(_local, 'stack', [])
+        _local.stack.append(self)
+        self.event['started'] = datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds')
+        if self.deep:
+            import cProfile
+            import tracemalloc
+            tracemalloc.start()
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+        self.rss = RssSampler().__enter__()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.rss.__exit__()
+        if self.deep:
+            self.profile.disable()
+            self._deep_fields()
+        _local.stack.pop()
+        self.event.update({'wall_s': wall, 'cpu_s': cpu,
+                           'rss_start_mb': self.rss.start / 2 ** 20,
+                           'peak_rss_delta_mb': (self.rss.peak - self.rss.start) / 2 ** 20,
+                           'error': None if exc_type is None else '{}: {}'.format(exc_type.__name__, exc)})
+        emit(self.event)
+        return False
+
+    def _deep_fields(self):
+        import pstats
+        import tracemalloc
+
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        self.event['traced_peak_mb'] = peak / 2 ** 20
+        self.event['allocations'] = [{'where': str(stat.traceback), 'size_mb': stat.size / 2 ** 20,
+                                      'blocks': stat.count}
+                                     for stat in snapshot.statistics('lineno')[:DEEP_TOP]]
+
+        stats = pstats.Stats(self.profile)
+        functions = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:DEEP_TOP]
+        self.event['profile'] = [{'function': '{}:{}({})'.format(*where), 'calls': calls, 'tottime_s': tottime,
+                                  'cumtime_s': cumtime}
+                                 for where, (_, calls, tottime, cumtime, _) in functions]
+        if _sink_path not in (None, '-'):
+            #the full profile, for snakeviz or pstats
+            path = '{}.{}.{}.prof'.format(_sink_path, self.event['stage'], os.getpid())
+            stats.dump_stats(path)
+            self.event['profile_path'] = path
+
+
+def stage(name, value_in=None, **fields):
+    """Context manager recording stage ``name``; ``value_in`` is its input frame.
+
+    Call ``output`` on the result with the output frame and ``set`` to add
+    fields to the event. Extra keyword arguments are added to the event.
+    """
+    if _sink is None:
+        return _NO_STAGE
+    return _Stage(name, value_in, fields)
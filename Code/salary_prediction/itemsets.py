@@ -0,0 +1,133 @@
+"""Frequent itemsets and association rules of the posting skills over packed bitsets.
+
+Every item (a skill category) gets one bit per posting. Its postings are
+packed 64 to a ``uint64`` word, so 10M postings take 1.25 MB per item. The
+support count of an itemset is the popcount of the AND of its items' words.
+The itemsets are mined depth first like Eclat. The extensions of a frequent
+itemset are the frequent itemsets that share its prefix. Each one is the AND
+of two bitsets already in hand, so a candidate costs one pass over n/64
+words. The candidates of a prefix are ANDed and popcounted together, in
+blocks of ``BLOCK_WORDS`` words. Only the bitsets along the current path are
+held. The itemsets come out in the same rows and order as mlxtend's
+``apriori``, and the rules with the same metrics as its
+``association_rules``. Neither needs the dense one-column-per-item boolean
+frame that mlxtend builds.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+#SWAR popcount masks, for numpy without bitwise_count
+_M1, _M2, _M4, _H01 = (np.uint64(m) for m in (0x5555555555555555, 0x3333333333333333, 0x0F0F0F0F0F0F0F0F,
+                                              0x0101010101010101))
+
+#Words of candidate bitsets ANDed at once
+BLOCK_WORDS = 2 ** 16
+
+#Rule metrics of association_rules, in mlxtend's column order
+RULE_METRICS = ['antecedent support', 'consequent support', 'support', 'confidence', 'lift', 'leverage',
+                'conviction']
+
+
+def popcount(words):
+    """Number of set bits in each row of the uint64 ``words`` array."""
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+    x = words - ((words >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return ((x * _H01) >> np.uint64(56)).sum(axis=-1, dtype=np.int64)
+
+
+def item_bitsets(transactions):
+    """``(items, words)`` uint64 bitsets of the items of ``transactions`` and the sorted item names.
+
+    Bit ``p`` of row ``i`` is set when transaction ``p`` holds item ``i``.
+    """
+    transactions = list(transactions)
+    lengths = np.fromiter(map(len, transactions), dtype=np.int64, count=len(transactions))
+    codes, items = pd.factorize(pd.Series(list(itertools.chain.from_iterable(transactions)), dtype=object))
+    #items in sorted order like TransactionEncoder
+    order = np.argsort(items.to_numpy().astype(str), kind='stable')
+    codes = np.argsort(order)[codes] if len(codes) else codes
+    items = list(items[order])
+
+    postings = np.repeat(np.arange(len(transactions)), lengths)
+    words = np.zeros((len(items), (len(transactions) + 63) // 64), dtype=np.uint64)
+    np.bitwise_or.at(words, (codes, postings >> 6), np.left_shift(np.uint64(1), (postings & 63).astype(np.uint64)))
+    return words, items
+
+
+def _extend(prefix, items, bits, min_count, max_len, found):
+    #items are the frequent extensions of prefix in item order, bits their bitsets
+    step = max(BLOCK_WORDS // max(bits.shape[1], 1), 1)
+    for pos, item in enumerate(items):
+        itemset = prefix + (item,)
+        if max_len is not None and len(itemset) >= max_len:
+            continue
+        children, joints = [], []
+        for start in range(pos + 1, len(items), step):
+            joint = bits[pos] & bits[start:start + step]
+            counts = popcount(joint)
+            frequent = np.flatnonzero(counts >= min_count)
+            for i in frequent:
+                found.append((itemset + (items[start + i],), int(counts[i])))
+                children.append(items[start + i])
+            joints.append(joint[frequent])
+        if children:
+            _extend(itemset, children, np.concatenate(joints), min_count, max_len, found)
+
+
+def frequent_itemsets(transactions, min_support=0.5, max_len=None):
+    """Itemsets held by at least ``min_support`` of ``transactions`` (iterables of items).
+
+    Returns the ``support`` and frozenset ``itemsets`` frame of mlxtend's
+    ``apriori(..., use_colnames=True)`` with the itemset ``length`` added,
+    ordered by length and then by item.
+    """
+    transactions = list(transactions)
+    words, items = item_bitsets(transactions)
+    n = len(transactions)
+    #the smallest count whose support passes the float comparison apriori makes
+    min_count = int(np.ceil(min_support * n))
+    while min_count > 0 and (min_count - 1) / n >= min_support:
+        min_count -= 1
+    while min_count / n < min_support:
+        min_count += 1
+
+    counts = popcount(words)
+    frequent = np.flatnonzero(counts >= min_count)
+    found = [((i,), int(counts[i])) for i in frequent]
+    _extend((), list(frequent), words[frequent], min_count, max_len, found)
+
+    found.sort(key=lambda entry: (len(entry[0]), entry[0]))
+    return pd.DataFrame({'support': [count / n for _, count in found],
+                         'itemsets': [frozenset(items[i] for i in itemset) for itemset, _ in found],
+                         'length': [len(itemset) for itemset, _ in found]})
+
+
+def association_rules(itemsets, metric='confidence', min_threshold=0.8):
+    """Rules ``antecedents -> consequents`` of a ``frequent_itemsets`` frame whose ``metric`` reaches ``min_threshold``.
+
+    Every split of every itemset of two or more items is a rule. They are
+    listed by itemset, larger antecedents first and then in item order.
+    """
+    support = dict(zip(itemsets['itemsets'], itemsets['support']))
+    rows = []
+    for itemset, joint in support.items():
+        ordered = sorted(itemset, key=str)
+        for size in range(len(ordered) - 1, 0, -1):
+            for antecedent in itertools.combinations(ordered, size):
+                antecedent = frozenset(antecedent)
+                consequent = itemset - antecedent
+                rows.append((antecedent, consequent, support[antecedent], support[consequent], joint))
+
+    rules = pd.DataFrame(rows, columns=['antecedents', 'consequents'] + RULE_METRICS[:3])
+    a, c, s = rules['antecedent support'], rules['consequent support'], rules['support']
+    rules['confidence'] = s / a
+    rules['lift'] = rules['confidence'] / c
+    rules['leverage'] = s - a * c
+    with np.errstate(divide='ignore'):
+        rules['conviction'] = np.where(rules['confidence'] < 1, (1 - c) / (1 - rules['confidence']), np.inf)
+    return rules[rules[metric] >= min_threshold].reset_index(drop=True)
@@ -0,0 +1,63 @@
+"""Reading the scraped Glassdoor postings (all_jobs.csv).
+
+Columns are read with declared dtypes and renamed as they are read, and the
+file can be streamed in fixed-size chunks.
+"""
+import pandas as pd
+
+JOBS_PATH = '../dataset/all_jobs.csv'
+
+#Raw header -> column name used in the analysis
+COLUMN_RENAMES = {'Job Title': 'job_title',
+                  'Salary Estimate': 'Salary_Estimate',
+                  'Job Description': 'Job_Description',
+                  'Company Name': 'Company_Name',
+                  'Type of ownership': 'Type_ownership',
+                  'Easy Apply': 'Easy_apply'}
+
+#Declared dtypes of the raw columns, -1 marks a missing value in the scrape.
+#'Unnamed: 0' is the saved index and is never read.
+DTYPES = {'Job Title': object,
+          'Salary Estimate': object,
+          'Job Description': object,
+          'Rating': 'float64',
+          'Company Name': object,
+          'Location': object,
+          'Headquarters': object,
+          'Size': object,
+          'Founded': 'float64',
+          'Type of ownership': object,
+          'Industry': object,
+          'Sector': object,
+          'Revenue': object,
+          'Competitors': object,
+          'Easy Apply': object}
+
+#Mostly empty columns the cleaning drops, read only when asked for by name
+UNUSED_COLUMNS = ['Competitors', 'Easy Apply']
+
+RAW_NAMES = {new: old for old, new in COLUMN_RENAMES.items()}
+
+
+def _rename(frame):
+    #Relabels in place, no copy of the data
+    frame.columns = [COLUMN_RENAMES.get(col, col) for col in frame.columns]
+    return frame
+
+
+def load_jobs(path=JOBS_PATH, columns=None, chunksize=None):
+    """Read the postings with declared dtypes and the analysis column names.
+
+    ``columns`` restricts the read to those columns (renamed or raw names),
+    by default every declared column but the ``UNUSED_COLUMNS``.
+    Without ``chunksize`` the whole file is returned as one DataFrame; with
+    it, an iterator of DataFrames of at most ``chunksize`` rows is returned,
+    so memory is bounded by the chunk size.
+    """
+    usecols = ([RAW_NAMES.get(col, col) for col in columns] if columns else
+               [col for col in DTYPES if col not in UNUSED_COLUMNS])
+    reader = pd.read_csv(path, usecols=usecols, dtype={col: DTYPES[col] for col in usecols},
+                         chunksize=chunksize)
+    if chunksize is None:
+        return _rename(reader)
+    return (_rename(chunk) for chunk in reader)
@@ -0,0 +1,408 @@
+"""Model frame, the six salary regressors and the persisted scoring pipeline.
+
+statsmodels, scikit-learn and xgboost are imported inside the functions
+that use them, so importing this module stays cheap.
+"""
+import os
+import pickle
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+TARGET = 'Est_Salary'
+
+#Numeric columns left out of the model
+NUMERIC_DROP = ['tableau', 'bi', 'Min_Salary', 'Max_Salary', 'Founded', 'MaxEmpSize', 'MaxRevenue']
+
+#Categorical columns left out of the model
+CATEGORIC_DROP = ['Industry', 'job_title', 'Company_Name', 'Location', 'Headquarters', 'Job_Domain', 'Job Role',
+                  'refined_skills', 'City', 'State', 'HQCity', 'HQState', 'Revenue_USD']
+
+#Categorical columns filled with their mode before one hot encoding
+CATEGORIC_FILL = ['Size', 'Revenue']
+
+#Number of features kept by SelectKBest for the bagging and AdaBoost models
+KBEST = 42
+
+MODEL_PATH = '../models/salary_model.pkl'
+
+
+def fit_category_modes(jobs):
+    """Mode of each ``CATEGORIC_FILL`` column on the training postings."""
+    return {col: jobs[col].mode()[0] for col in CATEGORIC_FILL}
+
+
+def design_frame(jobs, category_modes=None, drop_first=True):
+    """Numeric columns plus one hot encoded categoricals and a ``const`` column (``df_dummy``).
+
+    ``jobs`` comes from ``features.model_features``. Scoring passes the
+    training ``category_modes`` and ``drop_first=False``, then aligns the
+    columns with the training design.
+    """
+    if category_modes is None:
+        category_modes = fit_category_modes(jobs)
+
+    df_numeric = jobs.select_dtypes(include=np.number).drop(columns=NUMERIC_DROP, errors='ignore')
+
+    #categorical columns as strings so the dummies come out sorted by label, as for object columns
+    df_categoric = jobs.select_dtypes(include=[object, 'category']).drop(columns=CATEGORIC_DROP, errors='ignore')
+    df_categoric = df_categoric.astype(object).fillna(category_modes)
+    #0/1 integers as before pandas 2, bool dummies would make the frame an object array for statsmodels
+    dummy_encoded_variables = pd.get_dummies(df_categoric, drop_first=drop_first, dtype=np.uint8)
+
+    df_dummy = pd.concat([df_numeric, dummy_encoded_variables], axis=1)
+    #intercept column for the linear model
+    df_dummy.insert(0, 'const', 1.0)
+    return df_dummy
+
+
+#Sparse design of design_matrix: CSR matrix X, target y (None when scoring), column names and row labels
+Design = namedtuple('Design', ['X', 'y', 'columns', 'index'])
+
+
+def design_matrix(jobs, category_modes=None, drop_first=True, columns=None):
+    """Sparse ``Design`` with the values and columns of ``design_frame``, without building a dense frame.
+
+    The one hot columns are written straight from the category codes, so
+    high-cardinality columns only cost one entry per posting. The numeric
+    columns are stored whole, zeros included, so XGBoost sees them as
+    present values and only the absent one hot entries as missing.
+    Scoring passes the training ``columns``: dummies of labels not in them
+    are left out and missing columns stay empty.
+    """
+    from scipy import sparse
+
+    if category_modes is None:
+        category_modes = fit_category_modes(jobs)
+
+    numeric = jobs.select_dtypes(include=np.number).drop(columns=NUMERIC_DROP + [TARGET], errors='ignore')
+    categoric = jobs.select_dtypes(include=[object, 'category']).drop(columns=CATEGORIC_DROP, errors='ignore')
+    categoric = categoric.astype(object).fillna(category_modes)
+    #get_dummies order: the categories of each column sorted, the first one left out with drop_first
+    encoded = {col: pd.Categorical(categoric[col]) for col in categoric}
+    if columns is None:
+        columns = ['const'] + list(numeric.columns)
+        for col, values in encoded.items():
+            columns += ['{}_{}'.format(col, label) for label in values.categories[1 if drop_first else 0:]]
+    columns = list(columns)
+    position = {col: i for i, col in enumerate(columns)}
+
+    #one slot per numeric column and per categorical column in every row, -1 marks an empty slot
+    n = len(jobs)
+    numeric_cols = ['const'] + list(numeric.columns)
+    present = [i for i, col in enumerate(numeric_cols) if col in position]
+    slots = [np.broadcast_to(np.array([position[numeric_cols[i]] for i in present], dtype=np.int64),
+                             (n, len(present)))]
+    values = [np.column_stack([np.ones(n), numeric.to_numpy(dtype=float)])[:, present]]
+    for col, labels in encoded.items():
+        #code -> column, the last entry is picked by the -1 code of a missing value
+        table = np.array([position.get('{}_{}'.format(col, label), -1) for label in labels.categories] + [-1])
+        slots.append(table[labels.codes][:, None])
+        values.append(np.ones((n, 1)))
+    slots = np.hstack(slots)
+    filled = slots >= 0
+
+    indptr = np.concatenate([[0], np.cumsum(filled.sum(axis=1))])
+    X = sparse.csr_matrix((np.hstack(values)[filled], slots[filled], indptr), shape=(n, len(columns)))
+    X.sort_indices()
+    y = jobs[TARGET] if TARGET in jobs else None
+    return Design(X, y, columns, jobs.index)
+
+
+def design_xy(design):
+    """``X`` and ``y`` of a ``design_frame`` frame or a ``design_matrix`` Design."""
+    if isinstance(design, Design):
+        return design.X, design.y
+    return design.drop([TARGET], axis=1), design[TARGET]
+
+
+#Relative tolerance of the LSMR solves and of the null space directions they reveal
+LSMR_TOL = 1e-10
+NULL_TOL = 1e-6
+
+#Random right-hand sides of the first rank probe, doubled while they all land in the null space
+RANK_PROBES = 4
+
+
+class SparseOLS:
+    """Least squares on a sparse design matrix solved with LSMR on the CSR matrix.
+
+    No columns x columns matrix is formed. The columns are scaled to unit
+    norm for the solve, and empty columns get a zero coefficient. The rank
+    comes from more LSMR solves. Started from zero, LSMR converges to the
+    minimum norm solution. For a random ``z``, the solve of ``X x = X z``
+    therefore returns the part of ``z`` in the row space of ``X``, and
+    ``z - x`` lies in the null space. The null space is spanned by a few such
+    differences, a small dense ``columns x probes`` matrix. Its dimension
+    gives the rank. Projecting it out of the coefficients gives the minimum
+    norm solution of the unscaled columns, the pseudo-inverse solution of
+    statsmodels. The R-squared is centered because the design has a constant
+    column.
+    """
+
+    def fit(self, X, y, random_state=0):
+        from scipy import sparse
+
+        y = np.asarray(y, dtype=float)
+        X = sparse.csc_matrix(X, dtype=float)
+        norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=0))).ravel()
+        filled = np.flatnonzero(norms > 0)
+        A = X[:, filled] @ sparse.diags(1 / norms[filled])
+
+        null = self._null_space(A, np.random.default_rng(random_state))
+        params = self._solve(A, y) / norms[filled]
+        if null.shape[1]:
+            basis = np.linalg.qr(null / norms[filled][:, None])[0]
+            params -= basis @ (basis.T @ params)
+
+        self.params = np.zeros(X.shape[1])
+        self.params[filled] = params
+        residuals = y - X @ self.params
+        self.nobs = X.shape[0]
+        self.rank = len(filled) - null.shape[1]
+        self.rsquared = 1 - residuals @ residuals / np.sum((y - y.mean()) ** 2)
+        self.rsquared_adj = 1 - (self.nobs - 1) / (self.nobs - self.rank) * (1 - self.rsquared)
+        return self
+
+    @staticmethod
+    def _solve(A, b):
+        from scipy.sparse.linalg import lsmr
+        return lsmr(A, b, atol=LSMR_TOL, btol=LSMR_TOL, maxiter=10 * A.shape[1])[0]
+
+    def _null_space(self, A, rng):
+        #orthonormal columns spanning the null space of A
+        probes = RANK_PROBES
+        while True:
+            Z = rng.standard_normal((A.shape[1], min(probes, A.shape[1])))
+            U, s, _ = np.linalg.svd(np.column_stack([z - self._solve(A, A @ z) for z in Z.T]), full_matrices=False)
+            nullity = int(np.sum(s > NULL_TOL * np.sqrt(A.shape[1])))
+            if nullity < Z.shape[1] or Z.shape[1] == A.shape[1]:
+                return U[:, :nullity]
+            probes *= 2
+
+    def predict(self, X):
+        return X @ self.params
+
+
+def fit_ols(X_train, y_train):
+    from scipy import sparse
+    if sparse.issparse(X_train):
+        return SparseOLS().fit(X_train, y_train)
+
+    import statsmodels.api as sm
+    return sm.OLS(y_train, X_train).fit()
+
+
+def fit_decision_tree(X_train, y_train, **params):
+    from sklearn.tree import DecisionTreeRegressor
+    return DecisionTreeRegressor(**params).fit(X_train, y_train)
+
+
+def fit_random_forest(X_train, y_train, **params):
+    from sklearn.ensemble import RandomForestRegressor
+    return RandomForestRegressor(**params).fit(X_train, y_train)
+
+
+def fit_bagging(X_train, y_train, tree_random_state=10, **params):
+    #Similar to a random forest, just that the DT's are having all the features to split on
+    from sklearn.ensemble import BaggingRegressor
+    from sklearn.tree import DecisionTreeRegressor
+    return BaggingRegressor(DecisionTreeRegressor(random_state=tree_random_state), **params).fit(X_train, y_train)
+
+
+def fit_adaboost(X_train, y_train, **params):
+    from sklearn.ensemble import AdaBoostRegressor
+    return AdaBoostRegressor(**params).fit(X_train, y_train)
+
+
+def fit_xgboost(X_train, y_train, **params):
+    import xgboost as xgb
+    return xgb.XGBRegressor(**params).fit(X_train, y_train)
+
+
+#name -> (label in the results table, fit function, trained on the SelectKBest features)
+MODELS = {'ols': ('Linreg full model', fit_ols, False),
+          'tree': ('Decision Tree Model', fit_decision_tree, False),
+          'forest': ('Random Forest', fit_random_forest, False),
+          'bagging': ('Ensemble Techniques (Bagging Meta Estimator)', fit_bagging, True),
+          'adaboost': ('Ensemble Techniques (ADA Boost)', fit_adaboost, True),
+          'xgboost': ('XGBoost', fit_xgboost, False)}
+
+#Keyword arguments of each fit function
+MODEL_PARAMS = {'ols': {},
+                'tree': {'random_state': 10},
+                'forest': {'n_estimators': 100, 'random_state': 10},
+                'bagging': {'tree_random_state': 10},
+                'adaboost': {'random_state': 10},
+                'xgboost': {'objective': 'reg:squarederror', 'colsample_bytree': 0.3, 'learning_rate': 0.1,
+                            'max_depth': 15, 'alpha': 10, 'n_estimators': 150}}
+
+#Models that read the absent entries of a sparse matrix as missing values, not zeros,
+#they are scored with the sparse layout they were trained on
+SPARSE_MISSING = {'xgboost'}
+
+#Fraction of the postings held out to score the models
+TEST_SIZE = 0.2
+
+
+def split_seed(name):
+    #the SelectKBest models were split with another seed in the notebook
+    return 1 if MODELS[name][2] else 10
+
+
+def split_rows(n, random_state, test_size=TEST_SIZE):
+    """Train and test row positions, the same rows ``train_test_split`` picks for ``n`` rows."""
+    from sklearn.model_selection import train_test_split
+    return train_test_split(np.arange(n), test_size=test_size, random_state=random_state)
+
+
+def model_splits(n, test_size=TEST_SIZE, names=None):
+    """``split_rows`` of each model in ``names`` (all of ``MODELS`` by default) for ``n`` rows."""
+    return {name: split_rows(n, split_seed(name), test_size) for name in (names or MODELS)}
+
+
+#the target may be a narrow int and the predictions float32, the errors are taken in float64
+def _rmse(actual, predicted):
+    return float(np.sqrt(np.mean((np.asarray(actual, dtype=float) - np.asarray(predicted, dtype=float)) ** 2)))
+
+
+def _r_squared(actual, predicted):
+    actual = np.asarray(actual, dtype=float)
+    return float(1 - np.sum((actual - np.asarray(predicted, dtype=float)) ** 2) / np.sum((actual - actual.mean()) ** 2))
+
+
+def _model_input(fitted, X):
+    return fitted['selector'].transform(X) if fitted['selector'] is not None else X
+
+
+def fit_model(name, X, y, split, params=None):
+    """Fit model ``name`` of ``MODELS`` on the ``split[0]`` rows of ``X``/``y``.
+
+    ``params`` defaults to ``MODEL_PARAMS[name]``. Returns a dict with the
+    fitted ``model`` and the SelectKBest ``selector`` (or None).
+    """
+    _, fit, kbest = MODELS[name]
+    if params is None:
+        params = MODEL_PARAMS[name]
+
+    selector = None
+    if kbest:
+        from sklearn.feature_selection import SelectKBest, f_regression
+        #the features are selected on all the rows, as in the notebook
+        selector = SelectKBest(f_regression, k=min(KBEST, X.shape[1])).fit(X, y)
+    fitted = {'name': name, 'model': None, 'selector': selector}
+
+    train = split[0]
+    X_train = _model_input(fitted, X)
+    X_train = X_train.iloc[train] if hasattr(X_train, 'iloc') else X_train[train]
+    fitted['model'] = fit(X_train, y.iloc[train], **params)
+    return fitted
+
+
+def evaluate_model(fitted, X, y, split):
+    """Results table row of a ``fit_model`` result, scored on the ``split[1]`` rows."""
+    name = fitted['name']
+    train, test = split
+    X_test = _model_input(fitted, X)
+    X_test = X_test.iloc[test] if hasattr(X_test, 'iloc') else X_test[test]
+    y_test = y.iloc[test]
+    predictions = fitted['model'].predict(X_test)
+
+    n = len(train)
+    p = X.shape[1]
+    if name == 'ols':
+        r_squared, adj_r_squared = fitted['model'].rsquared, fitted['model'].rsquared_adj
+    else:
+        r_squared = _r_squared(y_test, predictions)
+        adj_r_squared = 1 - (1 - r_squared) * (n - 1) / (n - p - 1)
+
+    return {'Model': MODELS[name][0], 'RMSE': _rmse(y_test, predictions),
+            'R-Squared': r_squared, 'Adj. R-Squared': adj_r_squared}
+
+
+def train_model(name, X, y, params=None):
+    """Fit model ``name`` of ``MODELS`` on an 80:20 split of ``X``/``y`` and score it on the test part.
+
+    Returns the ``fit_model`` dict with the ``metrics`` row of the results table.
+    """
+    split = split_rows(len(X), split_seed(name))
+    fitted = fit_model(name, X, y, split, params)
+    fitted['metrics'] = evaluate_model(fitted, X, y, split)
+    return fitted
+
+
+def train_models(df_dummy, names=None):
+    """Train the models in ``names`` (all of ``MODELS`` by default) one after the other.
+
+    ``df_dummy`` is a ``design_frame`` frame or a ``design_matrix`` Design.
+    Returns the results table and a ``{name: train_model result}`` dict.
+    """
+    X, y = design_xy(df_dummy)
+    fitted = {name: train_model(name, X, y) for name in (names or MODELS)}
+    result_tabulation = pd.DataFrame([entry['metrics'] for entry in fitted.values()],
+                                     columns=['Model', 'RMSE', 'R-Squared', 'Adj. R-Squared'])
+    return result_tabulation, fitted
+
+
+def save_pipeline(fitted, fill_values, category_modes, feature_columns, vocabularies, path=MODEL_PATH,
+                  sparse=False):
+    """Persist everything needed to score new postings with the model in ``fitted``.
+
+    ``sparse`` records that the model was trained on a ``design_matrix``.
+    """
+    pipeline = {'name': fitted['name'],
+                'sparse': sparse,
+                'model': fitted['model'],
+                'selector': fitted['selector'],
+                'fill_values': fill_values,
+                'category_modes': category_modes,
+                'vocabularies': vocabularies,
+                'feature_columns': list(feature_columns)}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'wb') as f:
+        pickle.dump(pipeline, f)
+    return path
+
+
+def load_pipeline(path=MODEL_PATH):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def featurize(pipeline, raw):
+    """Design matrix of raw postings, aligned with the training features of ``pipeline``.
+
+    A frame, or a ``design_matrix`` Design for a pipeline trained on one.
+    """
+    from . import instrument
+    from .clean import clean_jobs, impute
+    from .features import model_features
+
+    #every posting is scored, a salary column in the input is ignored
+    jobs = clean_jobs(raw.drop(columns=['Salary_Estimate'], errors='ignore'))
+    with instrument.stage('impute', jobs) as event:
+        jobs = model_features(impute(jobs, pipeline['fill_values']), pipeline['vocabularies'])
+        event.output(jobs)
+    with instrument.stage('encode', jobs) as event:
+        if pipeline.get('sparse'):
+            X = design_matrix(jobs, pipeline['category_modes'], drop_first=False, columns=pipeline['feature_columns'])
+        else:
+            X = design_frame(jobs, pipeline['category_modes'], drop_first=False)
+            X = X.reindex(columns=pipeline['feature_columns'], fill_value=0)
+        event.output(X)
+    return X
+
+
+def predict(pipeline, raw):
+    """Predicted ``Est_Salary`` for each of the raw postings."""
+    from . import instrument
+
+    X = featurize(pipeline, raw)
+    index = X.index
+    if isinstance(X, Design):
+        X = X.X
+    with instrument.stage('predict', X, model=pipeline['name']) as event:
+        predictions = pipeline['model'].predict(_model_input(pipeline, X))
+        event.output(predictions)
+    return pd.Series(np.asarray(predictions).ravel(), index=index, name='Predicted_Salary')
@@ -0,0 +1,165 @@
+"""Concurrent training of the regressors under one CPU budget.
+
+Each model is fitted in its own worker process. The design matrix is saved
+once as ``.npy`` files that every worker memory-maps read-only, so the
+training data is shared instead of pickled to each worker. Every model gets
+a thread allowance from the budget: the ones that can use threads get their
+``n_jobs`` set to it, and BLAS/OpenMP pools are capped to it in every worker.
+A model only starts when its allowance fits in what the running ones leave
+of the budget, and a model running past its timeout is terminated.
+"""
+import multiprocessing
+import os
+import tempfile
+import time
+from multiprocessing.connection import wait
+
+import numpy as np
+import pandas as pd
+
+from . import models
+
+#Parameter setting the thread count of the models that can use threads, the rest run on one core
+THREAD_PARAMS = {'forest': 'n_jobs', 'bagging': 'n_jobs', 'xgboost': 'n_jobs'}
+
+
+def allocate_threads(names, cpu_budget):
+    """Threads of each model: one for the single-threaded ones, the rest of the budget shared by the others."""
+    threaded = [name for name in names if name in THREAD_PARAMS]
+    threads = {name: 1 for name in names if name not in THREAD_PARAMS}
+    spare = max(cpu_budget - len(threads), len(threaded))
+    for i, name in enumerate(threaded):
+        threads[name] = spare // len(threaded) + (i < spare % len(threaded))
+    return threads
+
+
+#Arrays of a CSR design matrix, shared one file each
+_CSR_ARRAYS = ('data', 'indices', 'indptr')
+
+
+def _share(X, y, directory):
+    if isinstance(X, pd.DataFrame):
+        np.save(os.path.join(directory, 'X.npy'), X.to_numpy(dtype=np.float64))
+    else:
+        for name in _CSR_ARRAYS:
+            np.save(os.path.join(directory, 'X.{}.npy'.format(name)), getattr(X, name))
+    np.save(os.path.join(directory, 'y.npy'), y.to_numpy(dtype=np.float64))
+
+
+def _open_shared(directory, columns):
+    #no copy is made, the frame or the CSR matrix is a view on the memory-mapped arrays
+    y = pd.Series(np.load(os.path.join(directory, 'y.npy'), mmap_mode='r'), name=models.TARGET)
+    if not os.path.exists(os.path.join(directory, 'X.npy')):
+        from scipy import sparse
+        arrays = [np.load(os.path.join(directory, 'X.{}.npy'.format(name)), mmap_mode='r') for name in _CSR_ARRAYS]
+        return sparse.csr_matrix(tuple(arrays), shape=(len(y), len(columns)), copy=False), y
+    X = pd.DataFrame(np.load(os.path.join(directory, 'X.npy'), mmap_mode='r'), columns=columns, copy=False)
+    return X, y
+
+
+def _fit_worker(name, directory, columns, split, params, threads, conn):
+    from threadpoolctl import threadpool_limits
+
+    start = time.perf_counter()
+    try:
+        X, y = _open_shared(directory, columns)
+        if name in THREAD_PARAMS:
+            params = dict(params, **{THREAD_PARAMS[name]: threads})
+        with threadpool_limits(limits=threads):
+            fitted = models.fit_model(name, X, y, split, params)
+        conn.send(('done', fitted, time.perf_counter() - start))
+    except Exception as error:
+        conn.send(('error', '{}: {}'.format(type(error).__name__, error), time.perf_counter() - start))
+    finally:
+        conn.close()
+
+
+def _timeout(timeout, name):
+    return timeout.get(name) if isinstance(timeout, dict) else timeout
+
+
+def fit_models(names, df_dummy, splits, params=None, cpu_budget=None, timeout=None):
+    """Fit the models in ``names`` concurrently on ``df_dummy`` within ``cpu_budget`` cores.
+
+    ``df_dummy`` is a ``design_frame`` frame or a ``design_matrix`` Design.
+    ``splits`` maps each model to its ``split_rows``, ``params`` overrides
+    ``MODEL_PARAMS`` per model and ``timeout`` is in seconds, either one
+    value for all models or a ``{name: seconds}`` dict.
+    Returns ``({name: fit_model result}, {name: seconds}, {name: error})``;
+    a model that failed or timed out is only in the errors.
+    """
+    cpu_budget = cpu_budget or os.cpu_count()
+    params = dict(models.MODEL_PARAMS, **(params or {}))
+    threads = allocate_threads(names, cpu_budget)
+    #the threaded models are the slow ones, start them first
+    queue = sorted(names, key=lambda name: name not in THREAD_PARAMS)
+    X, y = models.design_xy(df_dummy)
+    columns = df_dummy.columns if isinstance(df_dummy, models.Design) else list(X.columns)
+
+    fitted, seconds, errors = {}, {}, {}
+    context = multiprocessing.get_context()
+    with tempfile.TemporaryDirectory(prefix='salary-train-') as directory:
+        _share(X, y, directory)
+        running = {}
+        while queue or running:
+            used = sum(threads[name] for name in running)
+            while queue and (not running or used + threads[queue[0]] <= cpu_budget):
+                name = queue.pop(0)
+                receiver, sender = context.Pipe(duplex=False)
+                process = context.Process(target=_fit_worker, name='fit-' + name,
+                                          args=(name, directory, columns, splits[name], params[name],
+                                                threads[name], sender))
+                process.start()
+                sender.close()
+                running[name] = (process, receiver, time.monotonic())
+                used += threads[name]
+
+            #sleep until a worker reports, exits or reaches its timeout
+            deadlines = [started + _timeout(timeout, name) - time.monotonic()
+                         for name, (_, _, started) in running.items() if _timeout(timeout, name) is not None]
+            wait([receiver for _, receiver, _ in running.values()] +
+                 [process.sentinel for process, _, _ in running.values()],
+                 timeout=max(min(deadlines), 0) if deadlines else None)
+
+            for name, (process, receiver, started) in list(running.items()):
+                limit = _timeout(timeout, name)
+                if receiver.poll():
+                    status, payload, seconds[name] = receiver.recv()
+                    if status == 'done':
+                        fitted[name] = payload
+                    else:
+                        errors[name] = payload
+                elif not process.is_alive():
+                    errors[name] = 'worker exited with code {}'.format(process.exitcode)
+                elif limit is not None and time.monotonic() - started > limit:
+                    process.terminate()
+                    errors[name] = 'timed out after {}s'.format(limit)
+                    seconds[name] = time.monotonic() - started
+                else:
+                    continue
+                process.join()
+                receiver.close()
+                del running[name]
+    return fitted, seconds, errors
+
+
+def train_models(df_dummy, names=None, params=None, cpu_budget=None, timeout=None):
+    """Parallel ``models.train_models``: fit concurrently, then score every model on its test rows.
+
+    The results table has a ``Seconds`` and a ``Status`` column; models that
+    failed or timed out keep their row with the error as status.
+    """
+    names = list(names or models.MODELS)
+    X, y = models.design_xy(df_dummy)
+    splits = models.model_splits(X.shape[0], names=names)
+    fitted, seconds, errors = fit_models(names, df_dummy, splits, params, cpu_budget, timeout)
+    rows = []
+    for name in names:
+        if name in fitted:
+            row = dict(models.evaluate_model(fitted[name], X, y, splits[name]), Status='ok')
+        else:
+            row = {'Model': models.MODELS[name][0], 'Status': errors[name]}
+        row['Seconds'] = seconds.get(name)
+        rows.append(row)
+    result_tabulation = pd.DataFrame(rows, columns=['Model', 'RMSE', 'R-Squared', 'Adj. R-Squared', 'Seconds', 'Status'])
+    return result_tabulation, fitted
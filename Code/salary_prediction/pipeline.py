@@ -0,0 +1,265 @@
+"""Memoized stage graph of the salary pipeline.
+
+    ingest -> dedup -> text -> numerics -> skills -> compact -> fill_values -> impute
+    -> vocabularies -> features -> category_modes -> encode -> split -> train_<model> -> evaluate
+
+Every stage names its inputs, the parameters it reads and the code it runs.
+Its key hashes those together with the keys of its inputs, so all keys are
+known before anything runs. A stage whose key is in the cache is loaded
+instead of executed, and its inputs are not even loaded. Changing only the
+XGBoost parameters changes the keys of ``train_xgboost`` and ``evaluate``,
+so only those two run again.
+"""
+import ast
+import hashlib
+import inspect
+import json
+import sys
+from collections import Counter, namedtuple
+
+import pandas as pd
+
+from . import cache, clean, dedup, features, instrument, load, models
+
+#func is called with the input values followed by the parameter values;
+#code lists the modules, functions and constants that make up the key,
+#files the parameters that are paths whose contents make up the key
+Stage = namedtuple('Stage', ['func', 'inputs', 'params', 'code', 'files'], defaults=((), (), (), ()))
+
+#What of MODELS goes into the keys, the fit functions are hashed by their source
+_MODEL_TABLE = [(name, label, kbest) for name, (label, _, kbest) in models.MODELS.items()]
+
+DEFAULT_PARAMS = dict({'path': load.JOBS_PATH, 'near_duplicates': None, 'test_size': models.TEST_SIZE,
+                       'sparse': False}, **models.MODEL_PARAMS)
+
+
+def _dedup(jobs, near_duplicates):
+    report = {}
+    jobs = dedup.drop_duplicates(jobs, near_duplicates, report=report)
+    if report.get('near_clusters'):
+        print('Dropped {} near duplicate postings, clusters by size: {}'.format(
+            report['near'], report['near_clusters']), file=sys.stderr)
+    return jobs
+
+
+def _numerics(jobs):
+    revenue_misses = Counter()
+    jobs = clean.parse_numerics(jobs, revenue_misses)
+    if revenue_misses:
+        print('Revenue labels missing from the lookup table:', dict(revenue_misses), file=sys.stderr)
+    return jobs
+
+
+def _encode(jobs, category_modes, sparse):
+    if sparse:
+        return models.design_matrix(jobs, category_modes)
+    return models.design_frame(jobs, category_modes)
+
+
+def _compact(jobs):
+    sizes = {}
+    jobs = clean.compact(jobs, sizes)
+    print('Compacted the cleaned postings from {:.1f} MB to {:.1f} MB ({:.1f}x smaller)'.format(
+        sizes['before'] / 2 ** 20, sizes['after'] / 2 ** 20, sizes['before'] / sizes['after']), file=sys.stderr)
+    return jobs
+
+
+def _split(df_dummy, test_size):
+    return models.model_splits(_xy(df_dummy)[0].shape[0], test_size)
+
+
+def _xy(df_dummy):
+    return models.design_xy(df_dummy)
+
+
+def feature_columns(df_dummy):
+    """Model input columns of the ``encode`` stage value."""
+    if isinstance(df_dummy, models.Design):
+        return df_dummy.columns
+    return list(df_dummy.columns.drop(models.TARGET))
+
+
+def _train(name, df_dummy, split, params):
+    X, y = _xy(df_dummy)
+    return models.fit_model(name, X, y, split[name], params)
+
+
+def _evaluate(df_dummy, split, *fitted):
+    X, y = _xy(df_dummy)
+    rows = [models.evaluate_model(entry, X, y, split[entry['name']]) for entry in fitted]
+    return pd.DataFrame(rows, columns=['Model', 'RMSE', 'R-Squared', 'Adj. R-Squared'])
+
+
+def _train_stage(name):
+    def train(df_dummy, split, params):
+        return _train(name, df_dummy, split, params)
+    return Stage(train, ('encode', 'split'), (name,),
+                 (_train, _xy, models.design_xy, models.fit_model, models._model_input, models.MODELS[name][1],
+                  models.SparseOLS, models.LSMR_TOL, models.NULL_TOL, models.RANK_PROBES, models.KBEST))
+
+
+def build_graph(names=None):
+    """Stages of the pipeline training the models in ``names`` (all of ``MODELS`` by default)."""
+    names = list(models.MODELS if names is None else names)
+    graph = {'ingest': Stage(load.load_jobs, (), ('path',), (load,), ('path',)),
+             'dedup': Stage(_dedup, ('ingest',), ('near_duplicates',), (_dedup, dedup)),
+             'text': Stage(clean.clean_text, ('dedup',), (), (clean,)),
+             'numerics': Stage(_numerics, ('text',), (), (_numerics, clean)),
+             'skills': Stage(clean.add_skills, ('numerics',), (), (clean, features)),
+             'compact': Stage(_compact, ('skills',), (), (_compact, clean.compact, clean._compact_column,
+                                                          clean.CATEGORY_RATIO)),
+             'fill_values': Stage(clean.fit_fill_values, ('compact',), (), (clean.fit_fill_values, clean.FILL_STRATEGY)),
+             'impute': Stage(clean.impute, ('compact', 'fill_values'), (), (clean.impute,)),
+             'vocabularies': Stage(features.fit_vocabularies, ('impute',), (),
+                                   (features.fit_vocabularies, features.CODE_MAPS)),
+             'features': Stage(features.model_features, ('impute', 'vocabularies'), (), (features,)),
+             'category_modes': Stage(models.fit_category_modes, ('features',), (),
+                                     (models.fit_category_modes, models.CATEGORIC_FILL)),
+             'encode': Stage(_encode, ('features', 'category_modes'), ('sparse',),
+                             (_encode, models.design_frame, models.design_matrix, models.NUMERIC_DROP,
+                              models.CATEGORIC_DROP)),
+             'split': Stage(_split, ('encode',), ('test_size',),
+                            (_split, _xy, models.design_xy, models.model_splits, models.split_rows,
+                             models.split_seed, _MODEL_TABLE))}
+    for name in names:
+        graph['train_' + name] = _train_stage(name)
+    graph['evaluate'] = Stage(_evaluate, ('encode', 'split') + tuple('train_' + name for name in names), (),
+                              (_evaluate, _xy, models.design_xy, models.evaluate_model, models._model_input,
+                               models._rmse, models._r_squared, _MODEL_TABLE))
+    return graph
+
+
+def _code_digest(obj):
+    if inspect.ismodule(obj) or inspect.isfunction(obj) or inspect.isclass(obj):
+        return inspect.getsource(obj)
+    return repr(obj)
+
+
+def stage_keys(graph, params):
+    """Key of every stage of ``graph`` from its code, parameters, files and the keys of its inputs."""
+    keys = {}
+
+    def key(name):
+        if name not in keys:
+            stage = graph[name]
+            digest = hashlib.sha256('{}:{}'.format(cache.CACHE_VERSION, name).encode())
+            for obj in stage.code:
+                digest.update(_code_digest(obj).encode())
+            for param in stage.params:
+                digest.update(json.dumps(params[param], sort_keys=True, default=str).encode())
+            for param in stage.files:
+                digest.update(cache.file_digest(params[param]).encode())
+            for upstream in stage.inputs:
+                digest.update(key(upstream).encode())
+            keys[name] = digest.hexdigest()[:32]
+        return keys[name]
+
+    for name in graph:
+        key(name)
+    return keys
+
+
+def _load(name, key, cache_dir):
+    value = cache.read_cache(name, key, cache_dir)
+    if value is None:
+        value = cache.read_object(name, key, cache_dir)
+    return value
+
+
+def _store(value, name, key, cache_dir):
+    if isinstance(value, pd.DataFrame):
+        cache.write_cache(value, name, key, cache_dir)
+    else:
+        cache.write_object(value, name, key, cache_dir)
+
+
+def _upstream(graph, targets):
+    stages = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in stages:
+            stages.add(name)
+            pending.extend(graph[name].inputs)
+    return stages
+
+
+def run(targets, params=None, names=None, cache_dir=cache.CACHE_DIR, executed=None,
+        cpu_budget=None, timeout=None, failed=None):
+    """Values of the ``targets`` stages, running only the stages not in the cache.
+
+    ``params`` overrides ``DEFAULT_PARAMS``; a model's entry replaces its
+    ``MODEL_PARAMS``. The names of the stages that ran are appended to the
+    ``executed`` list when one is given.
+    With a ``cpu_budget`` the train stages to run are fitted concurrently by
+    ``parallel.fit_models`` with the per-model ``timeout``. Models that fail
+    or time out are left out of ``evaluate`` and of the returned targets,
+    and their errors go to the ``failed`` dict when one is given.
+    """
+    params = dict(DEFAULT_PARAMS, **(params or {}))
+    names = list(models.MODELS if names is None else names)
+    graph = build_graph(names)
+    keys = stage_keys(graph, params)
+    values = {}
+
+    def get(name):
+        if name not in values:
+            value = None
+            if cache.has_entry(name, keys[name], cache_dir):
+                with instrument.stage(name, key=keys[name], source='cache') as event:
+                    value = _load(name, keys[name], cache_dir)
+                    event.output(value)
+            if value is None:
+                stage = graph[name]
+                args = [get(upstream) for upstream in stage.inputs] + [params[param] for param in stage.params]
+                with instrument.stage(name, args[0] if args else None, key=keys[name], source='run') as event:
+                    value = stage.func(*args)
+                    event.output(value)
+                _store(value, name, keys[name], cache_dir)
+                if executed is not None:
+                    executed.append(name)
+            values[name] = value
+        return values[name]
+
+    needed = _upstream(graph, targets)
+    pending = [name for name in names if 'train_' + name in needed
+               and not cache.has_entry('train_' + name, keys['train_' + name], cache_dir)]
+    if cpu_budget is not None and len(pending) > 1:
+        from . import parallel
+
+        with instrument.stage('train', get('encode'), models=pending, cpu_budget=cpu_budget) as event:
+            fitted, seconds, errors = parallel.fit_models(pending, get('encode'), get('split'),
+                                                          {name: params[name] for name in pending}, cpu_budget,
+                                                          timeout)
+            event.set(model_seconds=seconds, errors=errors)
+        for name, entry in fitted.items():
+            _store(entry, 'train_' + name, keys['train_' + name], cache_dir)
+            values['train_' + name] = entry
+            if executed is not None:
+                executed.append('train_' + name)
+        if errors:
+            if failed is not None:
+                failed.update(errors)
+            names = [name for name in names if name not in errors]
+            targets = [name for name in targets if name.replace('train_', '', 1) not in errors]
+            graph = build_graph(names)
+            keys = stage_keys(graph, params)
+
+    return {name: get(name) for name in targets}
+
+
+def parse_overrides(items):
+    """``DEFAULT_PARAMS`` overrides from ``name=value`` or ``model.param=value`` strings."""
+    params = {}
+    for item in items or ():
+        name, _, value = item.partition('=')
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            pass
+        if '.' in name:
+            model, param = name.split('.', 1)
+            params.setdefault(model, dict(DEFAULT_PARAMS[model]))[param] = value
+        else:
+            params[name] = value
+    return params
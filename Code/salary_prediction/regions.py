@@ -0,0 +1,89 @@
+"""Regional drill-downs: the postings and the aggregates of any set of states.
+
+``RegionIndex`` copies the postings once into a layout grouped by state and
+keeps the row range of every state. The postings of a state are then an
+``iloc`` slice, a view that copies nothing. A set of states is the list of
+those slices, merged where the states are adjacent in the layout. Only
+``rows`` copies, and only the region's postings.
+
+The national-vs-regional reports need no postings at all. ``region_table``
+reads the rows of the given states from a cube grouping led by ``State``,
+which ``.loc`` finds through the sorted index. It then sums them. The work is
+proportional to the region's groups, not to the national postings. Those
+groupings keep one row per company, so the distinct companies of a region
+are counted exactly, even for a company that posts in several of its states.
+"""
+import numpy as np
+import pandas as pd
+
+from .cube import salary_stats
+
+#Measures summed over the states of a region, the companies are counted apart
+_ADDITIVE = ['Jobs', 'salary_count', 'salary_sum', 'salary_sumsq']
+
+
+class RegionIndex:
+    """The postings of ``jobs`` grouped by ``column`` with the row range of every value."""
+
+    def __init__(self, jobs, column='State'):
+        codes, labels = pd.factorize(jobs[column], sort=True)
+        order = np.argsort(codes, kind='stable')
+        #postings without a state sort first and belong to no region
+        starts = np.searchsorted(codes[order], np.arange(len(labels) + 1))
+        self.column = column
+        self.order = order
+        self.jobs = jobs.take(order)
+        self.bounds = {label: (starts[i], starts[i + 1]) for i, label in enumerate(labels)}
+
+    def ranges(self, states):
+        """Sorted ``(start, stop)`` row ranges of ``states`` in ``jobs``, adjacent ones merged."""
+        ranges = []
+        for start, stop in sorted(self.bounds[state] for state in set(states) if state in self.bounds):
+            if ranges and ranges[-1][1] == start:
+                ranges[-1] = (ranges[-1][0], stop)
+            else:
+                ranges.append((start, stop))
+        return ranges
+
+    def views(self, states):
+        """The postings of ``states`` as views of ``jobs``, one per range."""
+        return [self.jobs.iloc[start:stop] for start, stop in self.ranges(states)]
+
+    def rows(self, states):
+        """The postings of ``states`` as one frame, a view when they form a single range."""
+        views = self.views(states)
+        if len(views) == 1:
+            return views[0]
+        return pd.concat(views) if views else self.jobs.iloc[:0]
+
+    def values(self, column, states):
+        """Array of ``column`` for the postings of ``states``."""
+        values = self.jobs[column].to_numpy()
+        return np.concatenate([values[start:stop] for start, stop in self.ranges(states)] or [values[:0]])
+
+    def positions(self, states):
+        """Positions of the postings of ``states`` in the original frame."""
+        return np.concatenate([self.order[start:stop] for start, stop in self.ranges(states)] or
+                              [self.order[:0]])
+
+
+def region_table(cube, grouping, states, distinct='Company_Name'):
+    """``cube.salary_table`` of ``grouping`` for the postings of ``states`` only.
+
+    Rolls up the cube grouping ``('State', *grouping, distinct)`` (or
+    ``('State', *grouping)`` when ``grouping`` holds ``distinct``).
+    """
+    grouping = list(grouping)
+    key = ('State',) + tuple(grouping) + (() if distinct in grouping else (distinct,))
+    table = cube[key]
+    present = sorted(set(states) & set(table.index.levels[0]))
+    cells = table.loc[present] if present else table.iloc[:0]
+
+    summed = cells[_ADDITIVE].groupby(level=grouping, sort=True).sum()
+    #one row per (state, ..., company): the distinct companies are the distinct (..., company) pairs
+    companies = cells.index.droplevel('State').unique()
+    if len(grouping) == len(companies.names):
+        summed['Companies'] = 1
+    else:
+        summed['Companies'] = pd.Series(1, index=companies).groupby(level=grouping, sort=True).size()
+    return salary_stats(summed[['Jobs', 'Companies'] + _ADDITIVE[1:]].reset_index())
@@ -0,0 +1,140 @@
+"""Batch scoring of new postings with a saved pipeline.
+
+    python -m salary_prediction predict new_postings.parquet --chunksize 50000 --workers 8
+
+The postings are read ``chunksize`` rows at a time from a CSV or a Parquet
+file, and only the raw columns the pipeline uses are read. Every chunk goes
+through the same vectorized cleaning and featurization as training (the
+fill values, category modes and feature columns come from the pipeline, so a
+chunk is scored exactly as if the whole file were). Chunks are scored in a
+pool of worker processes that load the pipeline once each. At most two
+chunks per worker are in flight, and predictions are written in input order
+as they come back, so memory stays bounded by the chunk size.
+"""
+import collections
+import os
+
+import pandas as pd
+
+from . import instrument, load, models
+
+#Raw columns read for scoring, the salary is predicted and the other two are dropped by the cleaning
+SKIPPED_COLUMNS = ['Salary Estimate', 'Competitors', 'Easy Apply']
+
+#Chunks queued per worker process
+CHUNKS_PER_WORKER = 2
+
+#Pipeline of this worker process, loaded once by _init_worker
+_pipeline = None
+
+
+def _is_parquet(path):
+    return path.endswith('.parquet') or path.endswith('.pq')
+
+
+def scored_columns(path):
+    """Raw columns of ``path`` that scoring reads."""
+    if _is_parquet(path):
+        from pyarrow import parquet
+        header = parquet.read_schema(path).names
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+    return [col for col in load.DTYPES if col in header and col not in SKIPPED_COLUMNS]
+
+
+def read_postings(path, chunksize=100000):
+    """Iterator of raw posting chunks of ``path`` (CSV or Parquet) with the analysis column names.
+
+    Row labels continue from one chunk to the next, like ``load_jobs``.
+    """
+    columns = scored_columns(path)
+    if not _is_parquet(path):
+        yield from load.load_jobs(path, columns, chunksize)
+        return
+
+    from pyarrow import parquet
+    start = 0
+    for batch in parquet.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+        chunk = batch.to_pandas().astype({col: load.DTYPES[col] for col in columns})
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield load._rename(chunk)
+
+
+def _init_worker(model_path, events, deep):
+    from threadpoolctl import threadpool_limits
+
+    from .parallel import THREAD_PARAMS
+
+    global _pipeline
+    _pipeline = models.load_pipeline(model_path)
+    #the workers share the cores, every one scores on a single thread
+    if _pipeline['name'] in THREAD_PARAMS:
+        _pipeline['model'].set_params(**{THREAD_PARAMS[_pipeline['name']]: 1})
+    threadpool_limits(limits=1)
+    instrument.configure(events, deep)
+
+
+def _score_chunk(chunk):
+    return models.predict(_pipeline, chunk)
+
+
+class _Writer:
+    """Appends prediction chunks to a CSV or Parquet file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.parquet = None
+        self.rows = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, predictions):
+        frame = predictions.to_frame()
+        if _is_parquet(self.path):
+            import pyarrow as pa
+            from pyarrow import parquet
+
+            table = pa.Table.from_pandas(frame)
+            if self.parquet is None:
+                self.parquet = parquet.ParquetWriter(self.path, table.schema)
+            self.parquet.write_table(table)
+        else:
+            frame.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0)
+        self.rows += len(frame)
+
+    def close(self):
+        if self.parquet is not None:
+            self.parquet.close()
+
+
+def score_file(model_path, path, output, chunksize=100000, workers=None):
+    """Score the postings of ``path`` with the pipeline saved at ``model_path`` into ``output``.
+
+    ``workers`` processes score the chunks concurrently (all cores by
+    default, 1 scores them in this process). Returns the number of postings
+    scored.
+    """
+    workers = workers or os.cpu_count()
+    chunks = read_postings(path, chunksize)
+    writer = _Writer(output)
+    try:
+        if workers == 1:
+            pipeline = models.load_pipeline(model_path)
+            for chunk in chunks:
+                writer.write(models.predict(pipeline, chunk))
+            return writer.rows
+
+        import multiprocessing
+        settings = instrument.settings()
+        with multiprocessing.get_context().Pool(workers, _init_worker, (model_path,) + settings) as pool:
+            #a bounded window of chunks in flight, collected in input order
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_score_chunk, (chunk,)))
+                if len(pending) >= workers * CHUNKS_PER_WORKER:
+                    writer.write(pending.popleft().get())
+            while pending:
+                writer.write(pending.popleft().get())
+        return writer.rows
+    finally:
+        writer.close()
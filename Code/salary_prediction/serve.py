@@ -0,0 +1,338 @@
+"""Online salary estimates over HTTP, with concurrent requests micro-batched.
+
+    python -m salary_prediction serve --model ../models/salary_model.pkl --port 8000
+    curl -d '{"Job Title": "Sr. Data Scientist", "Location": "Arlington, VA", "Size": "51 to 200 employees"}' \\
+        localhost:8000/predict
+    curl localhost:8000/metrics
+
+Building a one-row DataFrame and running ``get_dummies`` costs milliseconds
+per posting. ``RowFeaturizer`` instead works out once where every input
+column of the model sits: the numeric features and each one hot
+``column_value`` of the saved feature columns. It then writes a posting
+straight into a preallocated numpy row, using the same rules as the cleaning,
+imputation and encoding stages. A posting gets the same features as it
+would in a file scored by ``models.predict``. Request threads queue their
+rows for one ``MicroBatcher`` thread. After the first row it waits at most
+``max_wait`` seconds for more, then predicts up to ``max_batch`` rows in one
+call.
+The server listens with a backlog of ``socket.SOMAXCONN`` connections
+rather than socketserver's 5. A burst of concurrent clients then waits to be
+accepted. With a backlog of 5, their connections were reset, and the metrics
+never saw those failures.
+A request that cannot be parsed or featurized gets a 400 reply, a model that
+fails a 500, and ``/metrics`` counts the two apart. It also returns the
+request and batch counters, the throughput, and the p50/p99 latency of the
+recent requests.
+"""
+import collections
+import functools
+import json
+import math
+import queue
+import socket
+import threading
+import time
+import warnings
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from . import clean, features, load, models, titles
+
+#Categorical columns of the model, one hot encoded as column_value
+_CATEGORIES = ['Size', 'Revenue', 'job_simp', 'seniority']
+
+#Requests kept for the latency percentiles
+LATENCY_WINDOW = 10000
+
+
+def _field(posting, name):
+    #a posting may use the raw or the analysis column names, -1 marks a missing value like in the scrape
+    value = posting.get(name, posting.get(load.RAW_NAMES.get(name, name)))
+    if value is None or value == -1 or value == '-1' or (isinstance(value, float) and math.isnan(value)):
+        return None
+    return value
+
+
+def _title_features(title):
+    return features.title_simplifier(title), features.seniority(title)
+
+
+class RowFeaturizer:
+    """Writes raw postings into the model input rows of a saved pipeline."""
+
+    def __init__(self, pipeline):
+        columns = list(pipeline['feature_columns'])
+        if pipeline['selector'] is not None:
+            columns = [columns[i] for i in pipeline['selector'].get_support(indices=True)]
+        self.columns = columns
+        self.position = {col: i for i, col in enumerate(columns)}
+        self.fill_values = pipeline['fill_values']
+        #postings repeat their titles, the title features cost a lookup after the first
+        self.title_features = functools.lru_cache(maxsize=titles.TITLE_CACHE_SIZE)(_title_features)
+        self.category_modes = pipeline['category_modes']
+        self.codes = {col: {label: code for code, label in enumerate(labels)}
+                      for col, labels in pipeline['vocabularies'].items()}
+        self.stopwords = frozenset(clean.EQUAL_EMP)
+        self.keywords = [(self.position[col], keyword) for col, keyword in features.SKILL_KEYWORDS.items()
+                         if col in self.position]
+
+        numeric = {'const', 'Rating', 'Years_Founded'} | set(features.SKILL_KEYWORDS) | set(self.codes)
+        prefixes = tuple(col + '_' for col in _CATEGORIES)
+        #a model trained on a sparse design saw the absent one hot entries as missing, not as zeros
+        self.missing = None
+        if pipeline.get('sparse') and pipeline['name'] in models.SPARSE_MISSING:
+            self.missing = np.array([i for i, col in enumerate(columns) if col.startswith(prefixes)])
+        unknown = [col for col in columns if col not in numeric and not col.startswith(prefixes)]
+        if unknown:
+            raise ValueError('No row featurization for the model columns {}'.format(unknown))
+
+    def row(self):
+        """A preallocated input row."""
+        return np.zeros(len(self.columns))
+
+    def _set(self, out, name, value):
+        if isinstance(value, str):
+            i = self.position.get(name + '_' + value)
+            if i is not None:
+                out[i] = 1.0
+        elif value is not None:
+            i = self.position.get(name)
+            if i is not None:
+                out[i] = value
+
+    def featurize(self, posting, out=None):
+        """Model input row of the raw ``posting`` dict, written into ``out`` when given."""
+        out = self.row() if out is None else out
+        out[:] = 0.0
+        self._set(out, 'const', 1.0)
+
+        #Rating and company age, imputed then truncated like features.to_int
+        rating = _field(posting, 'Rating')
+        self._set(out, 'Rating', int(self.fill_values['Rating'] if rating is None else float(rating)))
+        founded = _field(posting, 'Founded')
+        self._set(out, 'Years_Founded', int(self.fill_values['Years_Founded'] if founded is None
+                                            else 2022 - float(founded)))
+
+        description = _field(posting, 'Job_Description') or ''
+        description = clean._normalize_chunk([description], self.stopwords)[0]
+        for i, keyword in self.keywords:
+            out[i] = keyword in description
+
+        #Coded columns, through the vocabularies saved with the model
+        location = _field(posting, 'Location')
+        coded = {'State_Location': None if location is None else location[-2:],
+                 'Sector': _field(posting, 'Sector') or self.fill_values['Sector'],
+                 'Type_ownership': _field(posting, 'Type_ownership') or self.fill_values['Type_ownership']}
+        for col, label in coded.items():
+            self._set(out, col, self.codes[col].get(label, features.UNSEEN_CODE))
+
+        title = _field(posting, 'job_title') or ''
+        self._set(out, 'Size', _field(posting, 'Size') or self.fill_values['Size'])
+        self._set(out, 'Revenue', _field(posting, 'Revenue') or self.category_modes['Revenue'])
+        job_simp, seniority = self.title_features(title)
+        self._set(out, 'job_simp', job_simp)
+        self._set(out, 'seniority', seniority)
+        if self.missing is not None:
+            absent = self.missing[out[self.missing] == 0]
+            out[absent] = np.nan
+        return out
+
+
+class Metrics:
+    """Request, error and batch counters with the latencies of the last ``window`` requests."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.recent = collections.deque(maxlen=window)
+        self.requests = self.errors = self.client_errors = self.batches = self.batched_rows = 0
+
+    def request(self, seconds, status=200):
+        with self.lock:
+            self.requests += 1
+            self.errors += status >= 400
+            self.client_errors += 400 <= status < 500
+            self.recent.append((time.monotonic(), seconds))
+
+    def batch(self, rows):
+        with self.lock:
+            self.batches += 1
+            self.batched_rows += rows
+
+    def snapshot(self):
+        with self.lock:
+            recent = list(self.recent)
+            counters = {'requests': self.requests, 'errors': self.errors, 'client_errors': self.client_errors,
+                        'server_errors': self.errors - self.client_errors, 'batches': self.batches,
+                        'mean_batch_rows': self.batched_rows / self.batches if self.batches else None}
+        uptime = time.monotonic() - self.started
+        latencies = np.array([seconds for _, seconds in recent]) * 1000
+        span = recent[-1][0] - recent[0][0] if len(recent) > 1 else 0
+        return dict(counters, uptime_s=uptime,
+                    throughput_rps=counters['requests'] / uptime if uptime else None,
+                    recent_throughput_rps=(len(recent) - 1) / span if span else None,
+                    p50_ms=float(np.percentile(latencies, 50)) if len(latencies) else None,
+                    p99_ms=float(np.percentile(latencies, 99)) if len(latencies) else None)
+
+
+class _Request:
+    __slots__ = ('row', 'value', 'error', 'done')
+
+    def __init__(self, row):
+        self.row = row
+        self.value = self.error = None
+        self.done = threading.Event()
+
+
+class MicroBatcher:
+    """Coalesces the rows submitted by concurrent threads into ``predict`` calls of up to ``max_batch`` rows."""
+
+    def __init__(self, pipeline, width, max_batch=64, max_wait=0.002, metrics=None):
+        self.pipeline = pipeline
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.batch = np.zeros((max_batch, width))
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self.thread.start()
+
+    def submit(self, row):
+        """Queue ``row``; wait on ``done`` of the returned request, then read its ``value`` or ``error``."""
+        request = _Request(row)
+        self.queue.put(request)
+        return request
+
+    def predict(self, row):
+        request = self.submit(row)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.value
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _collect(self, first):
+        pending = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(pending) < self.max_batch:
+            try:
+                request = self.queue.get(timeout=max(deadline - time.perf_counter(), 0))
+            except queue.Empty:
+                break
+            if request is None:
+                #stop after this batch
+                self.queue.put(None)
+                break
+            pending.append(request)
+        return pending
+
+    def _run(self):
+        while True:
+            first = self.queue.get()
+            if first is None:
+                return
+            pending = self._collect(first)
+            X = self.batch[:len(pending)]
+            for i, request in enumerate(pending):
+                X[i] = request.row
+            try:
+                values = np.asarray(self.pipeline['model'].predict(X)).ravel()
+            except Exception as error:
+                for request in pending:
+                    request.error = error
+            else:
+                for request, value in zip(pending, values):
+                    request.value = float(value)
+            for request in pending:
+                request.done.set()
+            if self.metrics is not None:
+                self.metrics.batch(len(pending))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    #headers and body go out as two writes, without Nagle the second one is not held back
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, error, start):
+        self.server.metrics.request(time.perf_counter() - start, status)
+        self._reply(status, {'error': '{}: {}'.format(type(error).__name__, error)})
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            self._reply(200, self.server.metrics.snapshot())
+        else:
+            self._reply(404, {'error': 'unknown path'})
+
+    def do_POST(self):
+        if self.path != '/predict':
+            self._reply(404, {'error': 'unknown path'})
+            return
+        start = time.perf_counter()
+        #a request that cannot be parsed or featurized is the client's error, a failing model the server's
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            postings = body if isinstance(body, list) else [body]
+            rows = np.zeros((len(postings), len(self.server.featurizer.columns)))
+            for posting, row in zip(postings, rows):
+                self.server.featurizer.featurize(posting, row)
+        except (KeyError, ValueError, TypeError, AttributeError) as error:
+            self._error(400, error, start)
+            return
+        try:
+            requests = [self.server.batcher.submit(row) for row in rows]
+            for request in requests:
+                request.done.wait()
+                if request.error is not None:
+                    raise request.error
+        except Exception as error:
+            self._error(500, error, start)
+            return
+        values = [{'Predicted_Salary': request.value} for request in requests]
+        self.server.metrics.request(time.perf_counter() - start)
+        self._reply(200, values if isinstance(body, list) else values[0])
+
+    def log_message(self, format, *args):
+        #one line per request would cost more than the prediction
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    #concurrent clients queue in the listen backlog until a handler thread accepts them
+    request_queue_size = socket.SOMAXCONN
+    daemon_threads = True
+
+
+def make_server(pipeline, host='127.0.0.1', port=8000, max_batch=64, max_wait=0.002):
+    """HTTP server scoring postings with ``pipeline``, call ``serve_forever`` on it."""
+    #the models were fitted on frames and are fed numpy rows here
+    warnings.filterwarnings('ignore', message='X does not have valid feature names')
+    server = _Server((host, port), _Handler)
+    server.featurizer = RowFeaturizer(pipeline)
+    server.metrics = Metrics()
+    server.batcher = MicroBatcher(pipeline, len(server.featurizer.columns), max_batch, max_wait, server.metrics)
+    return server
+
+
+def serve(model_path=models.MODEL_PATH, host='127.0.0.1', port=8000, max_batch=64, max_wait=0.002):
+    server = make_server(models.load_pipeline(model_path), host, port, max_batch, max_wait)
+    print('Serving salary estimates on http://{}:{}/predict'.format(*server.server_address[:2]))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
@@ -0,0 +1,115 @@
+"""Statistical tests of the salaries computed from sufficient statistics.
+
+A one-way ANOVA of a column needs only the count, sum and sum of squares of
+the target in each of its groups. ``anova_stats`` gets them for many columns
+at once. Each column is factorized once, and the three sums are
+``np.bincount`` calls, so no group becomes a Python list. The statistics of
+two chunks of postings merge by adding them group by group
+(``merge_anova_stats``), so ``streamed_anova`` tests a file read in chunks
+exactly as if it were read whole.
+
+The t-tests of a salary between the postings with and without each of many
+keywords work the same way. With the 0/1 keyword matrix ``X`` and the
+centered salaries ``y``, the products ``X.T @ 1``, ``X.T @ y`` and
+``X.T @ y**2`` give the count, sum and sum of squares of every "with" group.
+The "without" groups are the totals minus those. ``batch_ttests`` screens
+thousands of keywords with three matrix products, and ``X`` may be a sparse
+matrix.
+"""
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+
+def anova_stats(jobs, columns, target='Est_Salary'):
+    """``{column: stats}`` of the ``count``, ``sum`` and ``sumsq`` of ``target`` per group of each column.
+
+    Postings missing the group or the target are left out, as in ``groupby``.
+    """
+    y = jobs[target].to_numpy(dtype=np.float64, na_value=np.nan)
+    present = ~np.isnan(y)
+    stats = {}
+    for col in columns:
+        codes, labels = pd.factorize(jobs[col], sort=True)
+        keep = present & (codes >= 0)
+        codes, values = codes[keep], y[keep]
+        n = len(labels)
+        stats[col] = pd.DataFrame({'count': np.bincount(codes, minlength=n).astype(np.float64),
+                                   'sum': np.bincount(codes, values, n),
+                                   'sumsq': np.bincount(codes, values * values, n)},
+                                  index=pd.Index(np.asarray(labels, dtype=object), name=col))
+    return stats
+
+
+def merge_anova_stats(left, right):
+    """Statistics of the postings behind ``left`` and ``right`` together."""
+    merged = dict(left)
+    for col, stats in right.items():
+        merged[col] = merged[col].add(stats, fill_value=0) if col in merged else stats
+    return merged
+
+
+def anova_table(stats):
+    """One-way ANOVA of every column of ``stats``: degrees of freedom, F statistic and p-value."""
+    from scipy.stats import f
+
+    rows = {}
+    for col, groups in stats.items():
+        groups = groups[groups['count'] > 0]
+        n, total = groups['count'].sum(), groups['sum'].sum()
+        between_means = (groups['sum'] ** 2 / groups['count']).sum()
+        ss_between = between_means - total ** 2 / n
+        ss_within = groups['sumsq'].sum() - between_means
+        df_between, df_within = len(groups) - 1, int(n) - len(groups)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            F = (ss_between / df_between) / (ss_within / df_within)
+        rows[col] = {'df_between': df_between, 'df_within': df_within, 'F': F,
+                     'P-value': f.sf(F, df_between, df_within)}
+    return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def streamed_anova(chunks, columns, target='Est_Salary'):
+    """``anova_table`` of the postings of an iterable of chunks, holding one chunk at a time."""
+    return anova_table(reduce(merge_anova_stats, (anova_stats(chunk, columns, target) for chunk in chunks)))
+
+
+def batch_ttests(X, y, names=None, equal_var=True):
+    """Two-sample t-tests of ``y`` between the rows with and without each column of the 0/1 matrix ``X``.
+
+    ``X`` is a dense or scipy sparse ``(rows, columns)`` matrix; the tests
+    are those of ``scipy.stats.ttest_ind`` (Welch's with ``equal_var=False``).
+    Returns one row per column, indexed by ``names``, with the group sizes,
+    means and variances, the t ``Statistic`` and its two-sided ``P-value``.
+    """
+    from scipy.stats import t as t_dist
+
+    y = np.asarray(y, dtype=np.float64)
+    #centering leaves the tests unchanged and keeps the sums of squares small
+    offset = y.mean()
+    y = y - offset
+    Xt = X.T
+    n1 = np.asarray(Xt @ np.ones(len(y))).ravel()
+    sum1 = np.asarray(Xt @ y).ravel()
+    sumsq1 = np.asarray(Xt @ (y * y)).ravel()
+    n0, sum0, sumsq0 = len(y) - n1, y.sum() - sum1, (y * y).sum() - sumsq1
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean1, mean0 = sum1 / n1, sum0 / n0
+        #sums of squared deviations, a group of one posting adds none to the pooled variance like in ttest_ind
+        ss1, ss0 = sumsq1 - n1 * mean1 ** 2, sumsq0 - n0 * mean0 ** 2
+        var1, var0 = ss1 / (n1 - 1), ss0 / (n0 - 1)
+        if equal_var:
+            df = n1 + n0 - 2
+            pooled = (ss1 + ss0) / df
+            se = np.sqrt(pooled * (1 / n1 + 1 / n0))
+        else:
+            v1, v0 = var1 / n1, var0 / n0
+            se = np.sqrt(v1 + v0)
+            df = (v1 + v0) ** 2 / (v1 ** 2 / (n1 - 1) + v0 ** 2 / (n0 - 1))
+        statistic = (mean1 - mean0) / se
+    return pd.DataFrame({'n_with': n1.astype(np.int64), 'n_without': n0.astype(np.int64),
+                         'mean_with': mean1 + offset, 'mean_without': mean0 + offset,
+                         'var_with': var1, 'var_without': var0,
+                         'Statistic': statistic, 'P-value': 2 * t_dist.sf(np.abs(statistic), df)},
+                        index=pd.Index(names if names is not None else range(len(n1)), name='TW'))
@@ -0,0 +1,161 @@
+"""Synthetic postings in the all_jobs.csv schema, for scaling benchmarks.
+
+Columns, salary strings, size and revenue buckets, "City, ST" locations,
+-1 placeholders and long descriptions with skill terms follow the scraped
+Glassdoor data, so every cleaning and modelling stage has real work to do.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from .clean import EQUAL_EMP, REVENUE_LABELS
+from .features import OWNERSHIP_CODES, SECTOR_CODES, SKILL_KEYWORDS, SKILL_TYPES, STATE_CODES
+
+RAW_COLUMNS = ['Unnamed: 0', 'Job Title', 'Salary Estimate', 'Job Description', 'Rating', 'Company Name',
+               'Location', 'Headquarters', 'Size', 'Founded', 'Type of ownership', 'Industry', 'Sector',
+               'Revenue', 'Competitors', 'Easy Apply']
+
+SENIORITY = ['', '', '', 'Senior ', 'Sr. ', 'Junior ', 'Lead ', 'Principal ']
+ROLES = ['Data Scientist', 'Data Analyst', 'Data Engineer', 'Business Analyst', 'Machine Learning Engineer',
+         'Business Intelligence Analyst', 'Analytics Manager', 'Director of Analytics', 'Consultant',
+         'Research Scientist', 'Reporting Analyst', 'Quality Assurance Analyst']
+DOMAINS = ['', '', '', ', Marketing', ', Big Data', ', Healthcare', ', Finance', ', Supply Chain', ', Product']
+
+SIZES = ['1 to 50 employees', '51 to 200 employees', '201 to 500 employees', '501 to 1000 employees',
+         '1001 to 5000 employees', '5001 to 10000 employees', '10000+ employees', 'Unknown', '-1']
+
+INDUSTRIES = ['IT Services', 'Computer Hardware & Software', 'Staffing & Outsourcing', 'Consulting',
+              'Health Care Services & Hospitals', 'Investment Banking & Asset Management', 'Insurance Carriers',
+              'Biotech & Pharmaceuticals', 'Internet', 'Enterprise Software & Network Solutions', '-1']
+
+#City names with the odd "City, County, ST" locations of the scrape
+CITIES = ['Springfield', 'Franklin', 'Greenville', 'Bristol', 'Clinton', 'Fairview', 'Salem', 'Madison',
+          'Georgetown', 'Arlington', 'Ashland', 'Dover', 'Oxford', 'Jackson', 'Burlington', 'Manchester']
+ODD_LOCATIONS = ['Centennial, Arapahoe, CO', 'Los Angeles, Los Angeles, CA']
+
+FILLER = ('the and to of a in with for our you will on as is are we be team work data business experience '
+          'ability support develop provide develop build across including new using customer product '
+          'solutions skills strong knowledge years required preferred degree bachelor master role '
+          'responsibilities opportunity environment technical project client help design analysis '
+          'insights stakeholders processes tools systems quality drive decisions growth company').split()
+
+
+def _vocabulary():
+    """Description words and their probabilities.
+
+    Mostly filler, with each skill keyword in about half of the postings
+    and the rest of the skill terms in a few percent of them.
+    """
+    skills = sorted({term for terms in SKILL_TYPES.values() for term in terms if len(term) > 1})
+    keywords = list(SKILL_KEYWORDS.values())
+    punctuated = [term.capitalize() + ',' for term in keywords] + ['5+', 'R,', 'C++']
+    words = FILLER + skills + keywords + punctuated
+    weights = ([0.95 / len(FILLER)] * len(FILLER) + [0.025 / len(skills)] * len(skills) +
+               [0.02 / len(keywords)] * len(keywords) + [0.005 / len(punctuated)] * len(punctuated))
+    return np.array(words, dtype=object), np.array(weights)
+
+
+def _salary_estimates(rng, rows):
+    low = rng.integers(20, 150, rows)
+    high = low + rng.integers(5, 90, rows)
+    kind = rng.random(rows)
+    yearly = np.where(kind < 0.8, ' (Glassdoor est.)', '(Employer est.)')
+    salary = np.char.add(np.char.add(np.char.add('$', low.astype(str)), 'K-$'), high.astype(str))
+    salary = np.char.add(np.char.add(salary, 'K'), yearly).astype(object)
+
+    per_hour = kind > 0.97
+    hourly_low = rng.integers(10, 60, per_hour.sum())
+    salary[per_hour] = ['${}-${} Per Hour(Glassdoor est.)'.format(a, a + b)
+                        for a, b in zip(hourly_low, rng.integers(2, 20, len(hourly_low)))]
+    salary[(kind > 0.955) & (kind <= 0.97)] = '-1'
+    return salary
+
+
+def _locations(rng, rows, odd=0.01):
+    cities = np.array(CITIES, dtype=object)[rng.integers(0, len(CITIES), rows)]
+    states = np.array(list(STATE_CODES), dtype=object)[rng.integers(0, len(STATE_CODES), rows)]
+    locations = cities + ', ' + states
+    odd_rows = rng.random(rows) < odd
+    locations[odd_rows] = np.array(ODD_LOCATIONS, dtype=object)[rng.integers(0, len(ODD_LOCATIONS), odd_rows.sum())]
+    return locations
+
+
+def _descriptions(rng, rows, words):
+    vocab, weights = _vocabulary()
+    lengths = rng.integers(words // 2, words * 3 // 2 + 1, rows)
+    tokens = vocab[rng.choice(len(vocab), lengths.sum(), p=weights)]
+    tagline = ' '.join(EQUAL_EMP)
+    with_tagline = rng.random(rows) < 0.1
+    descriptions = []
+    start = 0
+    for length, tag in zip(lengths, with_tagline):
+        text = ' '.join(tokens[start:start + length])
+        descriptions.append(text + ' ' + tagline if tag else text)
+        start += length
+    return descriptions
+
+
+def _pick(rng, values, rows, missing=0.0):
+    picked = np.array(values, dtype=object)[rng.integers(0, len(values), rows)]
+    if missing:
+        picked[rng.random(rows) < missing] = '-1'
+    return picked
+
+
+def generate_postings(rows, seed=0, words=300, duplicates=0.02, start=0):
+    """``rows`` raw postings in the all_jobs.csv schema.
+
+    Descriptions average ``words`` words. A ``duplicates`` share of the rows
+    repeats an earlier posting's description, title and location so the
+    dedup stage has work. ``start`` offsets the ``Unnamed: 0`` counter when
+    the postings are generated in chunks.
+    """
+    rng = np.random.default_rng(seed)
+
+    titles = (_pick(rng, SENIORITY, rows) + _pick(rng, ROLES, rows) + _pick(rng, DOMAINS, rows))
+    companies = ['Company {}\n{:.1f}'.format(c, r) for c, r in zip(rng.integers(0, max(rows // 20, 50), rows),
+                                                                  rng.uniform(2.5, 5, rows))]
+    rating = np.round(rng.uniform(1, 5, rows), 1)
+    rating[rng.random(rows) < 0.1] = -1
+    founded = rng.integers(1850, 2021, rows).astype(float)
+    founded[rng.random(rows) < 0.15] = -1
+
+    headquarters = _locations(rng, rows)
+    headquarters[rng.random(rows) < 0.005] = 'New York, NY (US), NY'
+    headquarters[rng.random(rows) < 0.05] = '-1'
+
+    jobs = pd.DataFrame({'Unnamed: 0': np.arange(start, start + rows),
+                         'Job Title': titles,
+                         'Salary Estimate': _salary_estimates(rng, rows),
+                         'Job Description': _descriptions(rng, rows, words),
+                         'Rating': rating,
+                         'Company Name': companies,
+                         'Location': _locations(rng, rows),
+                         'Headquarters': headquarters,
+                         'Size': _pick(rng, SIZES, rows),
+                         'Founded': founded,
+                         'Type of ownership': _pick(rng, list(OWNERSHIP_CODES), rows, missing=0.05),
+                         'Industry': _pick(rng, INDUSTRIES, rows),
+                         'Sector': _pick(rng, list(SECTOR_CODES), rows, missing=0.05),
+                         'Revenue': _pick(rng, REVENUE_LABELS, rows, missing=0.05),
+                         'Competitors': _pick(rng, ['-1', '-1', 'Accenture, Deloitte', 'IBM, Oracle'], rows),
+                         'Easy Apply': _pick(rng, ['-1'] * 24 + ['True'], rows)},
+                        columns=RAW_COLUMNS)
+
+    repeated = np.flatnonzero(rng.random(rows) < duplicates)
+    repeated = repeated[repeated > 0]
+    if len(repeated):
+        source = (rng.random(len(repeated)) * repeated).astype(int)
+        for col in ['Job Title', 'Job Description', 'Location']:
+            jobs.loc[repeated, col] = jobs[col].to_numpy()[source]
+    return jobs
+
+
+def write_postings(path, rows, seed=0, words=300, chunksize=100000):
+    """Write ``rows`` synthetic postings to the CSV ``path``, ``chunksize`` rows at a time."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    for i, start in enumerate(range(0, rows, chunksize)):
+        chunk = generate_postings(min(chunksize, rows - start), seed=seed + i, words=words, start=start)
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    return path
@@ -0,0 +1,151 @@
+"""Normalization of the job titles into the ``job_title2`` of the linear model report.
+
+The normalization rewrites the upper-cased titles through tables of regex
+substitutions with the semantics of ``Series.replace`` with lists. The
+rewrites of a table run in order, each on the output of the ones before it.
+A rewrite only applies to a title its pattern matched before the table
+started. So 'SR/STAFF' becomes 'SR STAFF': the 'SR ' rewrite never fires,
+although the '/' rewrite before it creates a match. Order matters as well:
+'BUSINESS DATA ANALYST' first becomes 'BUSINESS DATA_ANALYST' and then
+'BUSINESS_DATA_ANALYST'. A single alternation of the whole table would take
+the leftmost match, 'BUSINESS DATA', first and give 'BUSINESS_DATA ANALYST'.
+
+``TitleNormalizer`` therefore compiles each table into as few passes as the
+order allows. A run of consecutive literal rewrites becomes one alternation
+with a dict of replacements when none of them can create, hide or overlap
+another's match:
+
+- no two of their patterns can overlap in a text;
+- no pattern can overlap the replacement of an earlier one;
+- a deletion, which joins its neighbours, is only followed by one-character
+  patterns.
+
+Under those conditions one pass gives the ordered result. Each unique title
+of a column is normalized once, through ``pd.factorize``, and the result is
+broadcast back to the rows. Single titles, as on the serving path, go through
+an LRU memo, so a repeated title costs a dictionary lookup.
+"""
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+#Tables of (pattern, replacement) regex rewrites of the upper-cased titles, applied in order
+TITLE_REWRITES = [
+    #special characters, plurals and abbreviations
+    [(',', ''), ('Â', ''), ('/', ' '), ('\t', ' '), ('\n', ' '), ('-', ' '), ('AND ', ''), ('&', ' '),
+     (r'\(', ' '), (r'\)', ' '), ('WITH ', ''), ('SYSTEMS', 'SYSTEM'), ('OPERATIONS', 'OPERATION'),
+     ('ANALYTICS', 'ANALYTIC'), ('SERVICES', 'SERVICE'), (r'\[', ''), (r'\]', ''), ('ENGINEERS', 'ENGINEER'),
+     ('NETWORKS', 'NETWORK'), ('GAMES', 'GAME'), ('MUSICS', 'MUSIC'), ('INSIGHTS', 'INSIGHT'),
+     ('SOLUTIONS', 'SOLUTION'), ('JR.', 'JUNIOR'), ('MARKETS', 'MARKET'), ('STANDARDS', 'STANDARD'),
+     ('FINANCE', 'FINANCIAL'), ('ENGINEERING', 'ENGINEER'), ('PRODUCTS', 'PRODUCT'), ('DEVELOPERS', 'DEVELOPER'),
+     ('SR. ', 'SENIOR '), ('SR ', 'SENIOR '), ('JR. ', 'JUNIOR '), ('JR ', 'JUNIOR ')],
+    #spaces
+    [('  ', ' '), ('   ', ' '), ('    ', ' ')],
+    #unifying words
+    [('BUSINESS INTELLIGENCE', 'BI'), ('INFORMATION TECHNOLOGY', 'IT'), ('QUALITY ASSURANCE', 'QA'),
+     ('USER EXPERIENCE', 'UX'), ('USER INTERFACE', 'UI'), ('DATA WAREHOUSE', 'DATA_WAREHOUSE'),
+     ('DATA ANALYST', 'DATA_ANALYST'), ('DATA BASE', 'DATABASE'), ('DATA QUALITY', 'DATA_QUALITY'),
+     ('DATA GOVERNANCE', 'DATA_GOVERNANCE'), ('BUSINESS ANALYST', 'BUSINESS_ANALYST'),
+     ('DATA MANAGEMENT', 'DATA_MANAGEMENT'), ('REPORTING ANALYST', 'REPORTING_ANALYST'),
+     ('BUSINESS DATA', 'BUSINESS_DATA'), ('SYSTEM ANALYST', 'SYSTEM_ANALYST'), ('DATA REPORTING', 'DATA_REPORTING'),
+     ('QUALITY ANALYST', 'QUALITY_ANALYST')],
+    #more unifying
+    [('DATA_ANALYST JUNIOR', 'JUNIOR DATA_ANALYST'), ('DATA_ANALYST SENIOR', 'SENIOR DATA_ANALYST'),
+     ('DATA  REPORTING_ANALYST', 'DATA_REPORTING_ANALYST')],
+]
+
+#Distinct titles memoized by TitleNormalizer.normalize
+TITLE_CACHE_SIZE = 2 ** 16
+
+_SPECIAL = set('.^$*+?{}[]|()\\')
+
+
+def _literal(pattern):
+    #the text matched by pattern when it has no regex operators, else None
+    chars, escaped = [], False
+    for char in pattern:
+        if escaped:
+            if char.isalnum():
+                return None
+            chars.append(char)
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char in _SPECIAL:
+            return None
+        else:
+            chars.append(char)
+    return None if escaped or not chars else ''.join(chars)
+
+
+def _overlap(a, b):
+    #whether matches of a and b can overlap in some text
+    if a in b or b in a:
+        return True
+    return any(a.endswith(b[:k]) or b.endswith(a[:k]) for k in range(1, min(len(a), len(b))))
+
+
+def _mergeable(group, literal):
+    #whether literal, rewritten after every (literal, replacement) of group, can join it in one pass
+    return all(not _overlap(earlier, literal)
+               and (not _overlap(replacement, literal) if replacement else len(literal) == 1)
+               for earlier, replacement in group)
+
+
+def compile_rewrites(rewrites):
+    """``[(regex, replacement)]`` passes giving the result of the ordered ``rewrites`` of one table.
+
+    ``replacement`` is a string, or a dict from the matched text to its
+    replacement when the pass merges several literal rewrites.
+    """
+    groups = []
+    for pattern, replacement in rewrites:
+        literal = _literal(pattern)
+        if literal is not None and groups and isinstance(groups[-1], list) and _mergeable(groups[-1], literal):
+            groups[-1].append((literal, replacement))
+        elif literal is not None:
+            groups.append([(literal, replacement)])
+        else:
+            groups.append((pattern, replacement))
+
+    passes = []
+    for group in groups:
+        if isinstance(group, tuple):
+            passes.append((re.compile(group[0]), group[1]))
+        elif len(group) == 1:
+            passes.append((re.compile(re.escape(group[0][0])), group[0][1]))
+        else:
+            passes.append((re.compile('|'.join(re.escape(literal) for literal, _ in group)), dict(group)))
+    return passes
+
+
+class TitleNormalizer:
+    """Rewrites job titles through the tables of ``rewrites``, each distinct title once."""
+
+    def __init__(self, rewrites=TITLE_REWRITES, cache_size=TITLE_CACHE_SIZE):
+        self.tables = [compile_rewrites(table) for table in rewrites]
+        self.normalize = functools.lru_cache(maxsize=cache_size)(self._normalize)
+
+    def _normalize(self, title):
+        for passes in self.tables:
+            title = start = title.upper()
+            for regex, replacement in passes:
+                #only the rewrites matching the title as the table started apply
+                if isinstance(replacement, dict):
+                    active = {literal: text for literal, text in replacement.items() if literal in start}
+                    if active:
+                        title = regex.sub(lambda match: active.get(match.group(), match.group()), title)
+                elif regex.search(start):
+                    title = regex.sub(replacement, title)
+        return title
+
+    def __call__(self, titles):
+        """Series of the normalized ``titles``, missing titles left missing."""
+        codes, uniques = pd.factorize(titles)
+        normalized = np.array([self._normalize(title) for title in uniques] + [np.nan], dtype=object)
+        return pd.Series(normalized[codes], index=titles.index, name=titles.name)
+
+
+normalize_job_titles = TitleNormalizer()